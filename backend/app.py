@@ -1,13 +1,20 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
+import asyncio
+import json
 import os
+import threading
+import time
+import traceback
 
-from models import load_and_process_data, HybridRecommender
+from models import load_and_process_data, HybridRecommender, load_artifacts, ModelRegistry, RecommendationCache
+from models import WorkerPool, PoolSaturatedError, PrecomputedStore
+from models.hybrid_recommender import configure_source_pool
 
 app = FastAPI(
     title="AI Recommendation System API",
@@ -28,9 +35,128 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables
-data = None
-recommender = None
+# Directory written by build_artifacts.py; loaded instead of refitting when present
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR", os.path.join(os.path.dirname(__file__), "artifacts"))
+
+# Seconds between scheduled background rebuilds (0 disables the timer)
+REBUILD_INTERVAL_SECONDS = float(os.environ.get("REBUILD_INTERVAL_SECONDS", "0"))
+
+# Start serving catalog endpoints before the sub-models are fitted (they build in the background)
+LAZY_MODEL_BUILD = os.environ.get("LAZY_MODEL_BUILD", "0") == "1"
+
+# Collaborative factor model: 'svd' (truncated SVD) or 'als' (fits observed ratings only)
+FACTORIZATION = os.environ.get("FACTORIZATION", "svd")
+
+# Nearest-neighbour index for content similarity and SVD/ALS scoring: 'exact' or 'ivf' (approximate)
+CONTENT_INDEX_TYPE = os.environ.get("CONTENT_INDEX_TYPE", "exact")
+SVD_INDEX_TYPE = os.environ.get("SVD_INDEX_TYPE", "exact")
+
+# Directory written by precompute.py; its top-N lists are served before live scoring
+PRECOMPUTED_DIR = os.environ.get("PRECOMPUTED_DIR", os.path.join(os.path.dirname(__file__), "precomputed"))
+PRECOMPUTED_MAX_AGE_SECONDS = float(os.environ.get("PRECOMPUTED_MAX_AGE_SECONDS", str(6 * 3600)))
+
+# Versioned reference to the served model; swapped atomically by background rebuilds
+registry = ModelRegistry()
+
+# Time budgets for each hybrid candidate source and for the whole hybrid call
+HYBRID_SOURCE_TIMEOUT_SECONDS = float(os.environ.get("HYBRID_SOURCE_TIMEOUT_SECONDS", "2.0"))
+HYBRID_DEADLINE_SECONDS = float(os.environ.get("HYBRID_DEADLINE_SECONDS", "3.0"))
+# How hybrid candidate lists are merged: 'weighted' (source weight, then rating) or 'rrf'
+HYBRID_FUSION = os.environ.get("HYBRID_FUSION", "weighted")
+
+# Hybrid recommendation results, keyed on (model version, user, product, limit)
+recommendation_cache = RecommendationCache(
+    max_entries=int(os.environ.get("RECOMMENDATION_CACHE_SIZE", "1024")),
+    max_bytes=int(os.environ.get("RECOMMENDATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
+)
+
+# Blocking recommender work runs here so it never stalls the event loop
+worker_pool = WorkerPool(
+    max_workers=int(os.environ.get("WORKER_THREADS", "0")) or None,
+    max_queue=int(os.environ.get("WORKER_QUEUE_SIZE", "64")),
+    timeout_seconds=float(os.environ.get("REQUEST_TIMEOUT_SECONDS", "10"))
+)
+# Every worker can have all three hybrid sources running at once
+configure_source_pool(worker_pool.max_workers)
+
+# Latest precomputed store (None until precompute.py has run)
+precomputed = None
+
+# Progress of the initial artifact / data load (later steps are in the model's build_status())
+data_load_status = {'status': 'pending', 'seconds': None, 'error': None}
+
+def current_model(detail: str = "System not ready", requires: tuple = ()):
+    """Snapshot of the served model, used for the whole request, once the required sub-models are built"""
+    model = registry.current
+    if model is None:
+        raise HTTPException(status_code=503 if data_load_status['status'] == 'building' else 500, detail=detail)
+    
+    if requires and not model.recommender.is_ready(*requires):
+        status = model.recommender.build_status()
+        failed = [step for step in requires if status[step]['status'] == 'failed']
+        if failed:
+            raise HTTPException(status_code=500, detail=f"Model build failed: {', '.join(failed)}")
+        # Lazy startup: still being fitted
+        raise HTTPException(status_code=503, detail="Model warming up, please retry", headers={"Retry-After": "5"})
+    return model
+
+async def run_in_pool(fn, *args, **kwargs):
+    """Run a blocking call on the worker pool, mapping overload to 503 and deadlines to 504"""
+    try:
+        return await worker_pool.run(fn, *args, **kwargs)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Request timed out")
+
+def cached_hybrid_recommendations(model, user_id: int, product_name: Optional[str], limit: int):
+    """Hybrid recommendations for a user, served from the precomputed store or result cache when possible"""
+    store = precomputed
+    if product_name is None and store is not None:
+        recommendations = store.lookup(user_id, limit, model.catalog)
+        if recommendations is not None:
+            return recommendations
+    
+    key = (user_id, product_name, limit)
+    recommendations = recommendation_cache.get(model.version, key)
+    if recommendations is None:
+        generation = recommendation_cache.generation(user_id)
+        recommendations = model.recommender.get_hybrid_recommendations(
+            user_id,
+            product_name,
+            top_n=limit,
+            source_timeout=HYBRID_SOURCE_TIMEOUT_SECONDS,
+            deadline=HYBRID_DEADLINE_SECONDS,
+            fusion=HYBRID_FUSION
+        )
+        # Only keep results every source contributed to; degraded ones (timeout, error, empty) are rescored
+        if all(status == 'ok' for status in recommendations.attrs.get('sources', {}).values()):
+            recommendation_cache.put(model.version, key, recommendations, user_id=user_id, generation=generation)
+    return recommendations
+
+def invalidate_users(user_ids):
+    """Stop serving cached and precomputed results for users whose history changed"""
+    for user_id in user_ids:
+        recommendation_cache.invalidate_user(user_id)
+    store = precomputed
+    if store is not None:
+        store.mark_stale(user_ids)
+
+def apply_interactions(interactions: list) -> dict:
+    """
+    Apply interactions to the served model, invalidating the users' results around the update.
+    
+    Runs entirely on the worker pool, so the invalidation happens even if the
+    request times out or is cancelled while the update is in progress; the
+    second pass drops results computed from the model before the update landed.
+    """
+    user_ids = {interaction['ID'] for interaction in interactions}
+    invalidate_users(user_ids)
+    try:
+        return registry.add_interactions(interactions)
+    finally:
+        invalidate_users(user_ids)
 
 # Pydantic models
 class Product(BaseModel):
@@ -48,6 +174,7 @@ class RecommendationResponse(BaseModel):
     products: List[Product]
     explanation: str
     total: int
+    sources: Optional[Dict[str, str]] = None
 
 class UserResponse(BaseModel):
     user_id: int
@@ -55,38 +182,219 @@ class UserResponse(BaseModel):
     avg_rating: float
     preferred_categories: List[str]
 
+# User and product IDs are stored as int32
+MAX_ID = 2**31 - 1
+
+class Interaction(BaseModel):
+    user_id: int = Field(..., ge=1, le=MAX_ID)
+    product_id: int = Field(..., ge=1, le=MAX_ID)
+    rating: float = Field(..., gt=0, le=5)
+
+class InteractionBatch(BaseModel):
+    interactions: List[Interaction]
+
+class InteractionResponse(BaseModel):
+    added: int
+    new_users: int
+    skipped: int
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=100000)
+    limit: int = Field(10, ge=1, le=20)
+
+# Users scored per worker-pool call when streaming a batch
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "512"))
+
+def _column(frame: pd.DataFrame, values, dtype) -> list:
+    """One response field as a list of native Python values (None for missing)"""
+    if values is None or np.isscalar(values):
+        return [values] * len(frame)
+    values = np.asarray(values, dtype=object if dtype is str else dtype)
+    if dtype is str:
+        values = values.astype(str).astype(object)
+    elif dtype is float:
+        values = np.where(np.isnan(values), None, values)
+    return values.tolist()
+
+def product_records(frame: pd.DataFrame, recommendation_type=None, confidence=None) -> list:
+    """
+    Product-schema dicts for a frame of products, built column-wise.
+    
+    recommendation_type and confidence default to the frame's columns of the
+    same name (None when absent); pass a scalar or Series to override them.
+    """
+    descriptions = np.asarray(_column(frame, frame['Description'], str), dtype=object)
+    long = np.fromiter((len(d) > 200 for d in descriptions), dtype=bool, count=len(descriptions))
+    descriptions[long] = [d[:200] + "..." for d in descriptions[long]]
+    
+    columns = {
+        'name': _column(frame, frame['Name'], str),
+        'brand': _column(frame, frame['Brand'], str),
+        'category': _column(frame, frame['Category'], str),
+        'rating': _column(frame, frame['Rating'], float),
+        'review_count': _column(frame, frame['ReviewCount'], int),
+        'image_url': _column(frame, frame['ImageURL'], str),
+        'description': descriptions.tolist(),
+        'recommendation_type': _column(frame, frame.get('recommendation_type') if recommendation_type is None else recommendation_type, object),
+        'confidence': _column(frame, frame.get('confidence') if confidence is None else confidence, float),
+    }
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+def products_response(frame: pd.DataFrame, **kwargs) -> JSONResponse:
+    """List[Product] response, serialized without per-row model validation"""
+    return JSONResponse(product_records(frame, **kwargs))
+
+def recommendation_response(frame: pd.DataFrame, explanation: str, **kwargs) -> JSONResponse:
+    """RecommendationResponse, serialized without per-row model validation"""
+    products = product_records(frame, **kwargs)
+    return JSONResponse({
+        "products": products,
+        "explanation": explanation,
+        "total": len(products),
+        "sources": frame.attrs.get('sources')
+    })
+
+def load_model():
+    """Load the artifacts (or fit on the CSV data) and publish the first model"""
+    start = time.perf_counter()
+    data_load_status.update(status='building')
+    try:
+        recommender = load_artifacts(ARTIFACT_DIR)
+        source = "artifacts"
+        
+        if recommender is not None:
+            print(f"✅ Loaded model artifacts from {ARTIFACT_DIR}")
+        else:
+            # No artifact yet: load and process data, then fit the recommender
+            data_path = os.path.join(os.path.dirname(__file__), "clean_data.csv")
+            data = load_and_process_data(data_path)
+            source = "csv"
+        data_load_status.update(status='ready', seconds=round(time.perf_counter() - start, 3))
+    except Exception as e:
+        data_load_status.update(status='failed', error=str(e))
+        raise
+    
+    if LAZY_MODEL_BUILD:
+        # Publish as soon as the catalog exists; model endpoints answer 503 until their sub-models are ready
+        if source == "csv":
+            recommender = build_recommender(data, lazy=True)
+        model = registry.publish(recommender, time.perf_counter() - start, source)
+        recommender.build_indexes()
+    else:
+        if source == "csv":
+            recommender = build_recommender(data)
+        recommender.build_indexes()
+        model = registry.publish(recommender, time.perf_counter() - start, source)
+    load_precomputed()
+    
+    print(f"✅ Data loaded successfully: {len(model.data)} products")
+    print(f"✅ Recommender system initialized")
+    return model
+
+def build_recommender(data, lazy: bool = False):
+    """Fit with the configured factorization and index types, warm-starting ALS from the served model"""
+    model = registry.current
+    return HybridRecommender(
+        data, lazy=lazy, factorization=FACTORIZATION, warm_start=model.recommender if model else None,
+        content_index_type=CONTENT_INDEX_TYPE, svd_index_type=SVD_INDEX_TYPE
+    )
+
+def load_model_in_background():
+    try:
+        load_model()
+    except Exception as e:
+        print(f"❌ Error loading data: {str(e)}")
+        traceback.print_exc()
+
 # Load data on startup
 @app.on_event("startup")
 async def startup_event():
-    global data, recommender
     try:
-        # Load and process data
-        data_path = os.path.join(os.path.dirname(__file__), "clean_data.csv")
-        data = load_and_process_data(data_path)
-        
-        # Initialize recommender
-        recommender = HybridRecommender(data)
-        
-        print(f"✅ Data loaded successfully: {len(data)} products")
-        print(f"✅ Recommender system initialized")
+        if LAZY_MODEL_BUILD:
+            # Accept traffic right away; /ready reports the build progress
+            threading.Thread(target=load_model_in_background, daemon=True).start()
+        else:
+            load_model()
         
+        if REBUILD_INTERVAL_SECONDS > 0:
+            asyncio.create_task(rebuild_periodically())
+    
     except Exception as e:
         print(f"❌ Error loading data: {str(e)}")
         raise e
 
+def load_precomputed():
+    """(Re)load the latest precomputed top-N store, if any, keeping the users already marked stale"""
+    global precomputed
+    previous = precomputed
+    precomputed = PrecomputedStore.load(
+        PRECOMPUTED_DIR, PRECOMPUTED_MAX_AGE_SECONDS, stale_users=previous.stale_users if previous is not None else None
+    )
+    if precomputed is not None:
+        print(f"✅ Loaded precomputed recommendations for {len(precomputed.user_index)} users")
+    return precomputed
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    worker_pool.shutdown()
+
+async def rebuild_periodically():
+    """Trigger a background rebuild every REBUILD_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(REBUILD_INTERVAL_SECONDS)
+        registry.start_rebuild(build_recommender)
+
 @app.get("/")
 async def root():
     return {"message": "AI Recommendation System API", "version": "1.0.0"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "data_loaded": data is not None}
+    """Liveness: answers while the process is up, whether or not the model is ready"""
+    model = registry.current
+    return {
+        "status": "healthy",
+        "data_loaded": model is not None,
+        "ready": model is not None and model.recommender.is_ready(),
+        "model_version": model.version if model else None,
+        "model_source": model.source if model else None,
+        "model_built_at": model.built_at if model else None,
+        "model_build_seconds": round(model.build_seconds, 3) if model else None,
+        "rebuilding": registry.rebuilding,
+        "last_rebuild_error": registry.last_error,
+        "factorization": model.recommender.collaborative.factorization_stats if model and model.recommender.is_ready('collaborative') else None,
+        "worker_pool": worker_pool.stats(),
+        "precomputed": precomputed.stats() if precomputed else None
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the model and all its components are built, 503 with per-step progress before"""
+    model = registry.current
+    steps = {'data': dict(data_load_status)}
+    if model is not None:
+        steps.update({step: dict(status) for step, status in model.recommender.build_status().items()})
+    ready = model is not None and model.recommender.is_ready()
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "ready": ready,
+        "lazy": LAZY_MODEL_BUILD,
+        "model_version": model.version if model else None,
+        "components": steps
+    })
+
+@app.post("/api/admin/rebuild", status_code=202)
+async def rebuild_model():
+    """Refit the recommender in the background and hot-swap it when ready"""
+    model = current_model()
+    started = registry.start_rebuild(build_recommender)
+    return {"started": started, "rebuilding": registry.rebuilding, "model_version": model.version}
 
 @app.get("/api/users", response_model=List[int])
 async def get_users():
     """Get all user IDs"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    model = current_model("Data not loaded")
+    data = model.data
     
     users = sorted(data['ID'].unique().tolist())
     return users
@@ -94,22 +402,17 @@ async def get_users():
 @app.get("/api/users/{user_id}", response_model=UserResponse)
 async def get_user_info(user_id: int):
     """Get user information"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    model = current_model("Data not loaded")
     
-    user_data = data[data['ID'] == user_id]
-    if user_data.empty:
+    profile = model.recommender.profiles.lookup(user_id)
+    if profile is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    total_purchases = len(user_data)
-    avg_rating = user_data['Rating'].mean()
-    preferred_categories = user_data['Category'].value_counts().head(5).index.tolist()
-    
     return UserResponse(
         user_id=user_id,
-        total_purchases=total_purchases,
-        avg_rating=round(avg_rating, 2),
-        preferred_categories=preferred_categories
+        total_purchases=profile['interactions'],
+        avg_rating=round(profile['avg_rating'], 2),
+        preferred_categories=profile['categories'][:5]
     )
 
 @app.get("/api/products", response_model=List[Product])
@@ -119,67 +422,35 @@ async def get_products(
     brand: Optional[str] = None
 ):
     """Get products with optional filtering"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    filtered_data = data.copy()
-    
-    if category:
-        filtered_data = filtered_data[
-            filtered_data['Category'].str.contains(category, case=False, na=False)
-        ]
-    
-    if brand:
-        filtered_data = filtered_data[
-            filtered_data['Brand'].str.contains(brand, case=False, na=False)
-        ]
-    
-    # Sort by rating and review count
-    filtered_data = filtered_data.sort_values(
-        ['Rating', 'ReviewCount'], 
-        ascending=[False, False]
-    ).head(limit)
-    
-    products = []
-    for _, row in filtered_data.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description'])
-        ))
-    
-    return products
+    model = current_model("Data not loaded")
+    
+    # Best rated products among the matching category/brand facets
+    filtered_data = model.catalog.top_rated(limit, category=category, brand=brand)
+    
+    return products_response(filtered_data)
 
 @app.get("/api/products/search", response_model=List[Product])
 async def search_products(
     query: str = Query(..., min_length=2),
     limit: int = Query(10, ge=1, le=50)
 ):
-    """Search products by name"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    search_results = data[
-        data['Name'].str.contains(query, case=False, na=False)
-    ].head(limit)
-    
-    products = []
-    for _, row in search_results.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description'])
-        ))
-    
-    return products
+    """Search products by name (case-insensitive substring), best rated first"""
+    model = current_model("Data not loaded")
+    
+    search_results = model.catalog.search(query, limit)
+    
+    return products_response(search_results)
+
+@app.get("/api/products/autocomplete", response_model=List[str])
+async def autocomplete_products(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Product names with a word starting with prefix, best rated first"""
+    model = current_model("Data not loaded")
+    
+    rows = model.catalog.search_index.search(prefix, limit, prefix=True)
+    return model.catalog.products['Name'].to_numpy()[rows].tolist()
 
 @app.get("/api/recommendations/user/{user_id}", response_model=RecommendationResponse)
 async def get_user_recommendations(
@@ -187,37 +458,17 @@ async def get_user_recommendations(
     limit: int = Query(10, ge=1, le=20)
 ):
     """Get personalized recommendations for a user"""
-    if data is None or recommender is None:
-        raise HTTPException(status_code=500, detail="System not ready")
+    model = current_model(requires=('collaborative',))
     
     # Get hybrid recommendations
-    recommendations = recommender.get_hybrid_recommendations(user_id, top_n=limit)
+    recommendations = await run_in_pool(cached_hybrid_recommendations, model, user_id, None, limit)
     
     if recommendations.empty:
         raise HTTPException(status_code=404, detail="No recommendations found")
     
-    # Convert to response format
-    products = []
-    for _, row in recommendations.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description']),
-            recommendation_type=row.get('recommendation_type'),
-            confidence=row.get('confidence')
-        ))
-    
     explanation = f"Personalized recommendations based on your shopping history and preferences"
     
-    return RecommendationResponse(
-        products=products,
-        explanation=explanation,
-        total=len(products)
-    )
+    return recommendation_response(recommendations, explanation)
 
 @app.get("/api/recommendations/hybrid/{user_id}", response_model=RecommendationResponse)
 async def get_hybrid_recommendations(
@@ -226,39 +477,50 @@ async def get_hybrid_recommendations(
     limit: int = Query(10, ge=1, le=20)
 ):
     """Get hybrid recommendations combining multiple approaches"""
-    if data is None or recommender is None:
-        raise HTTPException(status_code=500, detail="System not ready")
+    model = current_model(requires=('collaborative', 'content_based'))
     
-    recommendations = recommender.get_hybrid_recommendations(
-        user_id, 
-        product_name, 
-        top_n=limit
-    )
+    recommendations = await run_in_pool(cached_hybrid_recommendations, model, user_id, product_name, limit)
     
     if recommendations.empty:
         raise HTTPException(status_code=404, detail="No recommendations found")
     
-    products = []
-    for _, row in recommendations.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description']),
-            recommendation_type=row.get('recommendation_type'),
-            confidence=row.get('confidence')
-        ))
-    
     explanation = f"Hybrid recommendations using multiple AI algorithms for better accuracy"
     
-    return RecommendationResponse(
-        products=products,
-        explanation=explanation,
-        total=len(products)
-    )
+    return recommendation_response(recommendations, explanation)
+
+@app.post("/api/recommendations/batch")
+async def get_batch_recommendations(batch: BatchRecommendationRequest):
+    """
+    Hybrid recommendations for many users, streamed as NDJSON (one user per line).
+    
+    Users are scored in chunks with batched matrix products; a line carries
+    "error" instead of "products" if a chunk could not be scored.
+    """
+    model = current_model(requires=('collaborative',))
+    user_ids = list(dict.fromkeys(batch.user_ids))
+    
+    async def stream():
+        for start in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+            chunk = user_ids[start:start + BATCH_CHUNK_SIZE]
+            try:
+                results = await run_in_pool(model.recommender.recommend_many_rows, chunk, batch.limit, fusion=HYBRID_FUSION)
+            except HTTPException as e:
+                for user_id in user_ids[start:]:
+                    yield json.dumps({"user_id": user_id, "error": e.detail}) + "\n"
+                return
+            
+            # Look up and serialize the whole chunk's products at once, then split them per user
+            rows, types, confidences = (np.concatenate(arrays) for arrays in zip(*(results[user_id] for user_id in chunk)))
+            products = product_records(model.recommender.catalog.get_rows(rows), recommendation_type=types, confidence=confidences)
+            lines = []
+            position = 0
+            for user_id in chunk:
+                user_products = products[position:position + len(results[user_id][0])]
+                position += len(user_products)
+                lines.append(json.dumps({"user_id": user_id, "products": user_products, "total": len(user_products)}))
+            yield "\n".join(lines) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @app.get("/api/recommendations/content/{product_name}", response_model=RecommendationResponse)
 async def get_content_based_recommendations(
@@ -266,34 +528,21 @@ async def get_content_based_recommendations(
     limit: int = Query(10, ge=1, le=20)
 ):
     """Get content-based recommendations for a product"""
-    if data is None or recommender is None:
-        raise HTTPException(status_code=500, detail="System not ready")
+    model = current_model(requires=('content_based',))
+    recommender = model.recommender
     
-    recommendations = recommender.content_based.get_recommendations(product_name, top_n=limit)
+    recommendations = await run_in_pool(recommender.content_based.get_recommendations, product_name, top_n=limit)
     
     if recommendations.empty:
         raise HTTPException(status_code=404, detail="Product not found or no recommendations")
     
-    products = []
-    for _, row in recommendations.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description']),
-            recommendation_type='content_based',
-            confidence=row.get('similarity_score', 0.8)
-        ))
-    
     explanation = f"Products similar to {product_name} based on features and characteristics"
     
-    return RecommendationResponse(
-        products=products,
-        explanation=explanation,
-        total=len(products)
+    return recommendation_response(
+        recommendations,
+        explanation,
+        recommendation_type='content_based',
+        confidence=recommendations.get('similarity_score', 0.8)
     )
 
 @app.get("/api/recommendations/similar/{product_name}", response_model=RecommendationResponse)
@@ -302,85 +551,70 @@ async def get_similar_products(
     limit: int = Query(5, ge=1, le=10)
 ):
     """Get similar products for a given product"""
-    if data is None or recommender is None:
-        raise HTTPException(status_code=500, detail="System not ready")
+    model = current_model(requires=('content_based',))
+    recommender = model.recommender
     
-    similar_products = recommender.get_similar_products(product_name, top_n=limit)
+    similar_products = await run_in_pool(recommender.get_similar_products, product_name, top_n=limit)
     
     if similar_products.empty:
         raise HTTPException(status_code=404, detail="Product not found or no similar products")
     
-    products = []
-    for _, row in similar_products.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description']),
-            recommendation_type='similar_products',
-            confidence=row.get('similarity_score', 0.8)
-        ))
-    
     explanation = f"Products similar to {product_name} that other customers also liked"
     
-    return RecommendationResponse(
-        products=products,
-        explanation=explanation,
-        total=len(products)
+    return recommendation_response(
+        similar_products,
+        explanation,
+        recommendation_type='similar_products',
+        confidence=similar_products.get('similarity_score', 0.8)
     )
 
 @app.get("/api/products/top-rated", response_model=RecommendationResponse)
 async def get_top_rated_products(limit: int = Query(10, ge=1, le=20)):
     """Get top-rated products across all categories"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    top_products = data.sort_values(
-        ['Rating', 'ReviewCount'], 
-        ascending=[False, False]
-    ).head(limit)
-    
-    products = []
-    for _, row in top_products.iterrows():
-        products.append(Product(
-            name=row['Name'],
-            brand=row['Brand'],
-            category=row['Category'],
-            rating=row['Rating'],
-            review_count=row['ReviewCount'],
-            image_url=row['ImageURL'],
-            description=row['Description'][:200] + "..." if len(str(row['Description'])) > 200 else str(row['Description']),
-            recommendation_type='top_rated',
-            confidence=0.9
-        ))
+    model = current_model("Data not loaded")
+    
+    top_products = model.catalog.top_rated(limit)
     
     explanation = "Highest rated products across all categories"
     
-    return RecommendationResponse(
-        products=products,
-        explanation=explanation,
-        total=len(products)
-    )
+    return recommendation_response(top_products, explanation, recommendation_type='top_rated', confidence=0.9)
+
+@app.post("/api/interactions", response_model=InteractionResponse)
+async def add_interactions(batch: InteractionBatch):
+    """Add new ratings and update the recommender without a rebuild"""
+    current_model(requires=('collaborative',))
+    
+    result = await run_in_pool(apply_interactions, [
+        {'ID': i.user_id, 'ProdID': i.product_id, 'Rating': i.rating}
+        for i in batch.interactions
+    ])
+    return InteractionResponse(**result)
+
+@app.post("/api/admin/precomputed/reload")
+async def reload_precomputed():
+    """Switch to the latest store written by precompute.py"""
+    store = await run_in_pool(load_precomputed)
+    return store.stats() if store else {"loaded": False}
+
+@app.get("/api/admin/cache")
+async def get_cache_stats():
+    """Recommendation cache size and hit/miss/eviction counters"""
+    return recommendation_cache.stats()
 
 @app.get("/api/categories", response_model=List[str])
 async def get_categories():
     """Get all available categories"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    model = current_model("Data not loaded")
     
-    categories = data['Category'].value_counts().head(20).index.tolist()
+    categories = model.recommender.facet_counts('Category').head(20).index.tolist()
     return categories
 
 @app.get("/api/brands", response_model=List[str])
 async def get_brands():
     """Get all available brands"""
-    if data is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    model = current_model("Data not loaded")
     
-    brands = data['Brand'].value_counts().head(50).index.tolist()
+    brands = model.recommender.facet_counts('Brand').head(50).index.tolist()
     return brands
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""
+Recall-vs-exact benchmark for the approximate nearest-neighbour indexes.
+
+Usage: python benchmark_ann.py [path/to/clean_data.csv] [--top-n 10] [--queries 200]
+"""
+import argparse
+import os
+import numpy as np
+
+from models import load_and_process_data, CollaborativeFilteringRecommender, ContentBasedRecommender
+from models.ann import IVFFlatIndex, benchmark_recall
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall against exact search")
+    parser.add_argument('data_path', nargs='?', default=os.path.join(os.path.dirname(__file__), "clean_data.csv"))
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    
+    data = load_and_process_data(args.data_path)
+    collaborative = CollaborativeFilteringRecommender(data)
+    content = ContentBasedRecommender(data, index_type='ivf')
+    
+    rng = np.random.default_rng(42)
+    suites = {
+        'svd': (collaborative.item_factors, collaborative.user_factors),
+        'content': (content.lsa_vectors, content.lsa_vectors),
+    }
+    
+    for name, (vectors, queries) in suites.items():
+        queries = queries[rng.choice(len(queries), min(args.queries, len(queries)), replace=False)]
+        index = IVFFlatIndex(vectors)
+        print(f"{name}: {len(vectors)} vectors, {index.n_lists} lists")
+        for nprobe in [1, 2, 4, 8, 16, 32]:
+            if nprobe > index.n_lists:
+                break
+            index.nprobe = nprobe
+            result = benchmark_recall(index, vectors, queries, args.top_n)
+            print(
+                f"  nprobe={nprobe:>3}  recall@{args.top_n}={result['recall']:.3f}  "
+                f"exact={result['exact_ms']:.3f}ms  ivf={result['approx_ms']:.3f}ms"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Fit the recommender once and write its state to a versioned artifact directory,
+which app.py memory-maps on startup instead of refitting.
+
+Usage: python build_artifacts.py [path/to/clean_data.csv] [--output artifacts] [--max-users N] [--factorization svd|als]
+       [--content-index-type exact|ivf] [--svd-index-type exact|ivf]
+"""
+import argparse
+import os
+import time
+
+from models import load_and_process_data, HybridRecommender, save_artifacts
+from models.factorization import FACTORIZATION_METHODS
+from models.ann import INDEX_TYPES
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build versioned model artifacts")
+    parser.add_argument('data_path', nargs='?', default=os.path.join(base_dir, "clean_data.csv"))
+    parser.add_argument('--output', default=os.environ.get("ARTIFACT_DIR", os.path.join(base_dir, "artifacts")))
+    parser.add_argument('--max-users', type=int, default=100)  # 0 keeps all users
+    parser.add_argument('--factorization', choices=FACTORIZATION_METHODS, default=os.environ.get("FACTORIZATION", "svd"))
+    parser.add_argument('--content-index-type', choices=list(INDEX_TYPES), default=os.environ.get("CONTENT_INDEX_TYPE", "exact"))
+    parser.add_argument('--svd-index-type', choices=list(INDEX_TYPES), default=os.environ.get("SVD_INDEX_TYPE", "exact"))
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    data = load_and_process_data(args.data_path, max_users=args.max_users or None)
+    recommender = HybridRecommender(
+        data, factorization=args.factorization,
+        content_index_type=args.content_index_type, svd_index_type=args.svd_index_type
+    )
+    directory = save_artifacts(recommender, args.output)
+    
+    print(f"✅ Artifacts written to {directory} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
 from .preprocess_data import process_data, load_and_process_data
+from .catalog import ProductCatalog
 from .content_based_filtering import ContentBasedRecommender
 from .collaborative_filtering import CollaborativeFilteringRecommender
 from .hybrid_recommender import HybridRecommender
+from .artifacts import save_artifacts, load_artifacts
+from .registry import ModelRegistry, ModelVersion
+from .cache import RecommendationCache
+from .worker_pool import WorkerPool, PoolSaturatedError
+from .precomputed import PrecomputedStore
 
 __all__ = [
     'process_data',
     'load_and_process_data', 
+    'ProductCatalog',
     'ContentBasedRecommender',
     'CollaborativeFilteringRecommender',
-    'HybridRecommender'
+    'HybridRecommender',
+    'save_artifacts',
+    'load_artifacts',
+    'ModelRegistry',
+    'ModelVersion',
+    'RecommendationCache',
+    'WorkerPool',
+    'PoolSaturatedError',
+    'PrecomputedStore'
 ]
@@ -0,0 +1,132 @@
+import time
+import numpy as np
+from .similarity import top_n_indices
+
+class ExactIndex:
+    """
+    Brute-force inner-product search over a dense float32 matrix (one row per item)
+    """
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    
+    def __len__(self):
+        return len(self.vectors)
+    
+    def search(self, query: np.ndarray, top_n: int, exclude=None):
+        """
+        Top-N (item indices, scores) by inner product with query, best first
+        """
+        scores = self.vectors @ np.asarray(query, dtype=np.float32)
+        if exclude is not None and len(exclude):
+            scores[exclude] = -np.inf
+        top_indices = top_n_indices(scores, top_n)
+        return top_indices, scores[top_indices]
+
+class IVFFlatIndex:
+    """
+    Inverted-file index with flat (uncompressed) lists for inner-product search.
+    
+    Items are clustered with spherical k-means into n_lists lists stored
+    contiguously; a query only scores the items in its nprobe closest lists.
+    """
+    def __init__(self, vectors: np.ndarray, n_lists: int = None, nprobe: int = 8,
+                 n_iter: int = 10, random_state: int = 42, block_size: int = 65536):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_items = len(vectors)
+        self.n_lists = max(1, min(n_items, n_lists or int(np.sqrt(n_items))))
+        self.nprobe = nprobe
+        self.block_size = block_size
+        
+        self.centroids = self._train_centroids(vectors, n_iter, random_state)
+        assignments = self._assign(vectors)
+        
+        # Store lists contiguously: items of list l are list_items[offsets[l]:offsets[l + 1]]
+        self.list_items = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))])
+        self.vectors = vectors[self.list_items]
+    
+    def __len__(self):
+        return len(self.list_items)
+    
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Closest centroid (by cosine) for every vector, in blocks to bound memory
+        """
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), self.block_size):
+            block = vectors[start:start + self.block_size]
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+    
+    def _train_centroids(self, vectors: np.ndarray, n_iter: int, random_state: int) -> np.ndarray:
+        """
+        Spherical k-means over the row-normalized vectors
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.maximum(norms, 1e-12)
+        
+        rng = np.random.default_rng(random_state)
+        self.centroids = unit[rng.choice(len(unit), self.n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignments = self._assign(unit)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, unit)
+            
+            # Keep the previous centroid for lists that ended up empty
+            lengths = np.linalg.norm(sums, axis=1, keepdims=True)
+            self.centroids = np.where(lengths > 0, sums / np.maximum(lengths, 1e-12), self.centroids)
+        
+        return self.centroids.astype(np.float32)
+    
+    def search(self, query: np.ndarray, top_n: int, exclude=None, nprobe: int = None):
+        """
+        Approximate top-N (item indices, scores) by inner product with query
+        """
+        query = np.asarray(query, dtype=np.float32)
+        probe = top_n_indices(self.centroids @ query, nprobe or self.nprobe)
+        positions = np.concatenate([
+            np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in probe
+        ])
+        
+        items = self.list_items[positions]
+        scores = self.vectors[positions] @ query
+        if exclude is not None and len(exclude):
+            scores[np.isin(items, exclude)] = -np.inf
+        top = top_n_indices(scores, top_n)
+        return items[top], scores[top]
+
+INDEX_TYPES = {'exact': ExactIndex, 'ivf': IVFFlatIndex}
+
+def build_index(vectors: np.ndarray, index_type: str = 'exact', **kwargs):
+    """
+    Build a nearest-neighbour index over item vectors ('exact' or 'ivf')
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {list(INDEX_TYPES)}")
+    return INDEX_TYPES[index_type](vectors, **kwargs)
+
+def benchmark_recall(index, vectors: np.ndarray, queries: np.ndarray, top_n: int = 10):
+    """
+    Recall@top_n and mean latency of an index against exact search over the same vectors
+    """
+    exact = ExactIndex(vectors)
+    hits = 0
+    exact_time = approx_time = 0.0
+    
+    for query in queries:
+        start = time.perf_counter()
+        expected, _ = exact.search(query, top_n)
+        exact_time += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        found, _ = index.search(query, top_n)
+        approx_time += time.perf_counter() - start
+        
+        hits += len(np.intersect1d(expected, found))
+    
+    n_queries = max(len(queries), 1)
+    return {
+        'recall': hits / max(n_queries * min(top_n, len(vectors)), 1),
+        'exact_ms': 1000 * exact_time / n_queries,
+        'approx_ms': 1000 * approx_time / n_queries,
+    }
@@ -0,0 +1,209 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .catalog import ProductCatalog
+from .content_based_filtering import ContentBasedRecommender
+from .collaborative_filtering import CollaborativeFilteringRecommender, RatingState
+from .hybrid_recommender import HybridRecommender
+from .ann import ExactIndex, IVFFlatIndex
+from .factorization import ALSFactorizer
+from .columnar import save_array, load_array, save_sparse, load_sparse, save_strings, load_strings, save_frame, load_frame
+from .columnar import stage_version, publish_version, latest_version
+
+# Bump whenever the on-disk layout changes; older artifacts are then ignored and rebuilt
+FORMAT_VERSION = 4
+MANIFEST_FILE = 'manifest.json'
+
+def _save_index(directory: str, name: str, index) -> dict:
+    if isinstance(index, IVFFlatIndex):
+        for field in ['centroids', 'list_items', 'list_offsets', 'vectors']:
+            save_array(directory, f'{name}.{field}', getattr(index, field))
+        return {'type': 'ivf', 'n_lists': index.n_lists, 'nprobe': index.nprobe, 'block_size': index.block_size}
+    return {'type': 'exact'}
+
+def _load_index(directory: str, name: str, meta: dict, vectors: np.ndarray):
+    if meta['type'] == 'exact':
+        return ExactIndex(vectors)
+    
+    index = IVFFlatIndex.__new__(IVFFlatIndex)
+    index.n_lists, index.nprobe, index.block_size = meta['n_lists'], meta['nprobe'], meta['block_size']
+    for field in ['centroids', 'list_items', 'list_offsets', 'vectors']:
+        setattr(index, field, load_array(directory, f'{name}.{field}'))
+    return index
+
+def save_artifacts(recommender: HybridRecommender, root_dir: str) -> str:
+    """
+    Write all fitted state of a HybridRecommender to a new versioned directory
+    under root_dir and point root_dir/LATEST at it. Returns the version directory.
+    """
+    version, staging = stage_version(root_dir)
+    
+    collaborative = recommender.collaborative
+    content = recommender.content_based
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'frames': {
+            'data': save_frame(staging, 'data', recommender.data),
+            'catalog': save_frame(staging, 'catalog', recommender.catalog.products),
+        },
+        'collaborative': {
+            'n_neighbors': collaborative.n_neighbors,
+            'n_item_neighbors': collaborative.n_item_neighbors,
+            'min_item_similarity': collaborative.min_item_similarity,
+            'svd_index_type': collaborative.svd_index_type,
+            'factorization': collaborative.factorization,
+            'factorization_stats': collaborative.factorization_stats,
+            'als': {
+                key: getattr(collaborative.als_model, key)
+                for key in ('n_factors', 'regularization', 'max_iterations', 'tolerance', 'random_state', 'block_entries')
+            } if collaborative.als_model is not None else None,
+            'svd_index': _save_index(staging, 'cf.svd_index', collaborative.svd_index),
+        },
+        'content': {
+            'n_neighbors': content.n_neighbors,
+            'index_type': content.index_type,
+            'lsa_components': content.lsa_components,
+            'vectorizer': {
+                key: value for key, value in content.vectorizer.get_params().items()
+                if key in ('stop_words', 'max_features', 'ngram_range')
+            },
+            'index': _save_index(staging, 'content.index', content.index) if content.index is not None else None,
+        },
+    }
+    
+    # Collaborative filtering: index maps, rating matrix, neighbour tables and factors
+    save_array(staging, 'cf.user_index', collaborative.user_index.to_numpy())
+    save_array(staging, 'cf.item_index', collaborative.item_index.to_numpy())
+    save_array(staging, 'cf.item_catalog_rows', collaborative.item_catalog_rows)
+    save_sparse(staging, 'cf.user_item_matrix', collaborative.user_item_matrix)
+    save_sparse(staging, 'cf.rating_counts', collaborative.rating_counts)
+    save_array(staging, 'cf.user_neighbors', collaborative.user_neighbors)
+    save_array(staging, 'cf.user_neighbor_scores', collaborative.user_neighbor_scores)
+    save_array(staging, 'cf.item_neighbors', collaborative.item_neighbors)
+    save_array(staging, 'cf.item_neighbor_scores', collaborative.item_neighbor_scores)
+    save_array(staging, 'cf.user_factors', collaborative.user_factors)
+    save_array(staging, 'cf.item_factors', collaborative.item_factors)
+    
+    # Content-based: TF-IDF vocabulary/idf, matrix and optional neighbour table / LSA vectors
+    save_strings(staging, 'content.vocabulary', content.vectorizer.get_feature_names_out())
+    save_array(staging, 'content.idf', content.vectorizer.idf_)
+    save_sparse(staging, 'content.tfidf_matrix', content.tfidf_matrix)
+    if content.neighbors is not None:
+        save_array(staging, 'content.neighbors', content.neighbors)
+        save_array(staging, 'content.neighbor_scores', content.neighbor_scores)
+    if content.lsa_vectors is not None:
+        save_array(staging, 'content.lsa_vectors', content.lsa_vectors)
+    
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    return publish_version(root_dir, version, staging)
+
+def _restore(cls, **attributes):
+    """
+    Create an instance without running its (fitting) constructor
+    """
+    instance = cls.__new__(cls)
+    instance.__dict__.update(attributes)
+    return instance
+
+def load_artifacts(root_dir: str):
+    """
+    Load the latest artifact version under root_dir as a HybridRecommender.
+    
+    Arrays are memory-mapped. Returns None when there is no usable artifact
+    (missing, or written with a different FORMAT_VERSION).
+    """
+    try:
+        directory = latest_version(root_dir)
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    
+    data = load_frame(directory, 'data', manifest['frames']['data'])
+    products = load_frame(directory, 'catalog', manifest['frames']['catalog'])
+    names = products['Name']
+    catalog = _restore(
+        ProductCatalog,
+        products=products,
+        prod_index=pd.Index(products['ProdID']),
+        name_lookup=dict(zip(names[::-1], range(len(names) - 1, -1, -1)))
+    )
+    
+    cf_meta = manifest['collaborative']
+    user_item_matrix = load_sparse(directory, 'cf.user_item_matrix')
+    item_factors = load_array(directory, 'cf.item_factors')
+    collaborative = _restore(
+        CollaborativeFilteringRecommender,
+        data=data,
+        catalog=catalog,
+        n_neighbors=cf_meta['n_neighbors'],
+        n_item_neighbors=cf_meta['n_item_neighbors'],
+        min_item_similarity=cf_meta['min_item_similarity'],
+        n_jobs=os.cpu_count(),
+        svd_index_type=cf_meta['svd_index_type'],
+        _state=RatingState(
+            user_index=pd.Index(load_array(directory, 'cf.user_index')),
+            user_item_matrix=user_item_matrix,
+            rating_counts=load_sparse(directory, 'cf.rating_counts'),
+            item_user_matrix=user_item_matrix.T.tocsr(),
+            user_neighbors=load_array(directory, 'cf.user_neighbors'),
+            user_neighbor_scores=load_array(directory, 'cf.user_neighbor_scores'),
+            item_neighbors=load_array(directory, 'cf.item_neighbors'),
+            item_neighbor_scores=load_array(directory, 'cf.item_neighbor_scores'),
+            user_factors=load_array(directory, 'cf.user_factors'),
+        ),
+        item_index=pd.Index(load_array(directory, 'cf.item_index')),
+        item_catalog_rows=load_array(directory, 'cf.item_catalog_rows'),
+        factorization=cf_meta['factorization'],
+        factorization_stats=cf_meta['factorization_stats'],
+        svd_model=None,
+        als_model=ALSFactorizer(**cf_meta['als'], n_threads=os.cpu_count()) if cf_meta['als'] else None,
+        item_factors=item_factors,
+        svd_index=_load_index(directory, 'cf.svd_index', cf_meta['svd_index'], item_factors),
+    )
+    
+    content_meta = manifest['content']
+    vectorizer = TfidfVectorizer(**{
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in content_meta['vectorizer'].items()
+    })
+    vocabulary = load_strings(directory, 'content.vocabulary')
+    vectorizer.vocabulary_ = {term: position for position, term in enumerate(vocabulary)}
+    vectorizer.idf_ = np.asarray(load_array(directory, 'content.idf'))
+    
+    has_neighbors = content_meta['n_neighbors'] is not None
+    lsa_vectors = load_array(directory, 'content.lsa_vectors') if content_meta['index'] else None
+    content_based = _restore(
+        ContentBasedRecommender,
+        data=data,
+        catalog=catalog,
+        n_neighbors=content_meta['n_neighbors'],
+        index_type=content_meta['index_type'],
+        lsa_components=content_meta['lsa_components'],
+        vectorizer=vectorizer,
+        tfidf_matrix=load_sparse(directory, 'content.tfidf_matrix'),
+        neighbors=load_array(directory, 'content.neighbors') if has_neighbors else None,
+        neighbor_scores=load_array(directory, 'content.neighbor_scores') if has_neighbors else None,
+        lsa_vectors=lsa_vectors,
+        index=_load_index(directory, 'content.index', content_meta['index'], lsa_vectors) if content_meta['index'] else None,
+    )
+    
+    return _restore(
+        HybridRecommender,
+        _data=data,
+        _pending_rows=[],
+        catalog=catalog,
+        _content_based=content_based,
+        _collaborative=collaborative,
+    )
@@ -0,0 +1,136 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+def _entry_size(value) -> int:
+    """
+    Approximate memory footprint of a cached value in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(value)
+
+class RecommendationCache:
+    """
+    Bounded LRU cache with TTL for recommendation results.
+    
+    Keys start with the model version: entries from older versions are dropped
+    as soon as a newer version is seen, and are never stored afterwards. Entries
+    are also indexed by user so they can be invalidated when that user's
+    interactions change; each invalidation bumps the user's generation, and a
+    put made with an older generation (computed before the change) is
+    dropped. Capacity is limited by entry count and total bytes.
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, user_id)
+        self._user_keys = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+    
+    def _remove(self, key):
+        _, size, _, user_id = self._entries.pop(key)
+        self.total_bytes -= size
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+    
+    def _sync_version(self, model_version):
+        if self.model_version is None or model_version > self.model_version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._user_keys.clear()
+            self.total_bytes = 0
+            self.model_version = model_version
+    
+    def get(self, model_version, key):
+        """
+        Cached value for key under model_version, or None
+        """
+        with self._lock:
+            self._sync_version(model_version)
+            entry = self._entries.get((model_version, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._remove((model_version, key))
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end((model_version, key))
+            self.hits += 1
+            return entry[0]
+    
+    def generation(self, user_id) -> int:
+        """
+        Current generation of a user's entries; read it before computing a value to put
+        """
+        with self._lock:
+            return self._generations.get(user_id, 0)
+    
+    def put(self, model_version, key, value, user_id=None, generation: int = None):
+        """
+        Store value for key, evicting least recently used entries over capacity.
+        
+        With a generation (from generation(user_id) before the value was
+        computed), the value is dropped if the user was invalidated since.
+        """
+        size = _entry_size(value)
+        with self._lock:
+            self._sync_version(model_version)
+            if model_version != self.model_version or size > self.max_bytes:
+                return
+            if generation is not None and generation != self._generations.get(user_id, 0):
+                return
+            full_key = (model_version, key)
+            if full_key in self._entries:
+                self._remove(full_key)
+            
+            self._entries[full_key] = (value, size, time.monotonic() + self.ttl_seconds, user_id)
+            self.total_bytes += size
+            self._user_keys.setdefault(user_id, set()).add(full_key)
+            
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate_user(self, user_id):
+        """
+        Drop every cached entry for a user and reject puts computed before this call
+        """
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            keys = list(self._user_keys.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_version': self.model_version,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
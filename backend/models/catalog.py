@@ -0,0 +1,121 @@
+from functools import cached_property
+import pandas as pd
+import numpy as np
+from .search import ProductSearchIndex
+from .facets import FacetIndex, intersect_sorted
+
+PRODUCT_COLUMNS = ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
+
+class ProductCatalog:
+    """
+    Deduplicated, columnar product table built once from the processed data.
+    
+    Holds one row per ProdID (first occurrence in the interaction table) with
+    hash indexes for ProdID -> row and Name -> row lookups.
+    """
+    def __init__(self, data: pd.DataFrame):
+        columns = ['ProdID'] + PRODUCT_COLUMNS + [col for col in ['Tags'] if col in data.columns]
+        self.products = data.drop_duplicates(subset=['ProdID'])[columns].reset_index(drop=True)
+        self.prod_index = pd.Index(self.products['ProdID'])
+        
+        # First row wins when several products share a name
+        names = self.products['Name']
+        self.name_lookup = dict(zip(names[::-1], range(len(names) - 1, -1, -1)))
+    
+    @cached_property
+    def rank_order(self) -> np.ndarray:
+        """
+        Catalog rows sorted by Rating, then ReviewCount (descending, missing last), built on first use
+        """
+        ratings = np.nan_to_num(self.products['Rating'].to_numpy(dtype=float), nan=-np.inf)
+        review_counts = np.nan_to_num(self.products['ReviewCount'].to_numpy(dtype=float), nan=-np.inf)
+        return np.lexsort((np.arange(len(self.products)), -review_counts, -ratings))
+    
+    @cached_property
+    def name_codes(self) -> np.ndarray:
+        """
+        Integer code per row, equal for rows sharing a name (for deduplicating by name), built on first use
+        """
+        return pd.factorize(self.products['Name'])[0]
+    
+    @cached_property
+    def ratings(self) -> np.ndarray:
+        """
+        Rating per row as floats (missing is NaN), built on first use
+        """
+        return self.products['Rating'].to_numpy(dtype=float)
+    
+    @cached_property
+    def search_index(self) -> ProductSearchIndex:
+        """
+        Name search index, built on first use
+        """
+        return ProductSearchIndex(self.products['Name'], self.rank_order)
+    
+    @cached_property
+    def facets(self) -> dict:
+        """
+        Category and Brand facet indexes, built on first use
+        """
+        return {
+            column: FacetIndex(self.products[column].array, self.rank_order)
+            for column in ['Category', 'Brand']
+        }
+    
+    def build_indexes(self):
+        """
+        Build the lazily created indexes now, off the request path
+        """
+        self.name_codes
+        self.ratings
+        self.search_index
+        self.facets
+    
+    def __len__(self):
+        return len(self.products)
+    
+    def rows_for_ids(self, prod_ids) -> np.ndarray:
+        """
+        Catalog rows for a list of ProdIDs (-1 for unknown IDs)
+        """
+        return self.prod_index.get_indexer(prod_ids)
+    
+    def row_for_name(self, product_name: str):
+        """
+        Catalog row for a product name, or None if unknown
+        """
+        return self.name_lookup.get(product_name)
+    
+    def get_rows(self, rows) -> pd.DataFrame:
+        """
+        Product details for catalog rows, in the given order
+        """
+        return self.products.iloc[rows][PRODUCT_COLUMNS].reset_index(drop=True)
+    
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> pd.DataFrame:
+        """
+        Best-rated products whose name contains query (or has a word starting with it)
+        """
+        return self.get_rows(self.search_index.search(query, limit, prefix))
+    
+    def top_rated(self, limit: int = 10, category: str = None, brand: str = None) -> pd.DataFrame:
+        """
+        Best products by Rating and ReviewCount, optionally only those whose
+        Category / Brand contains the given text (case-insensitive)
+        """
+        return self.get_rows(self.top_rated_rows(limit, category, brand))
+    
+    def top_rated_rows(self, limit: int = 10, category: str = None, brand: str = None) -> np.ndarray:
+        """
+        Catalog rows of top_rated(limit, category, brand)
+        """
+        positions = None
+        for column, query in [('Category', category), ('Brand', brand)]:
+            if query:
+                facet = self.facets[column]
+                matches = facet.positions_for(facet.matching_labels(query))
+                positions = matches if positions is None else intersect_sorted(positions, matches)
+        
+        if positions is None:
+            return self.rank_order[:limit]
+        return self.rank_order[positions[:limit]]
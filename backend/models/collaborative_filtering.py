@@ -1,172 +1,515 @@
+import os
+import time
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
+from scipy import sparse
+from .similarity import top_n_indices, top_k_neighbors, update_top_k_neighbors, row_norms
+from .catalog import ProductCatalog
+from .ann import build_index
+from .factorization import ALSFactorizer, FACTORIZATION_METHODS
+
+def rated_indicator(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    0/1 matrix with the sparsity pattern of matrix (shares its index arrays)
+    """
+    return sparse.csr_matrix((np.ones(matrix.nnz, dtype=np.float32), matrix.indices, matrix.indptr), shape=matrix.shape)
+
+def _replace_rows(matrix: sparse.csr_matrix, rows: np.ndarray, replacement: sparse.csr_matrix, n_rows: int) -> sparse.csr_matrix:
+    """
+    Copy of matrix grown to n_rows (new rows empty) with the given sorted rows
+    replaced by the rows of replacement, whose width may be larger.
+    
+    The untouched rows are copied as contiguous slices of the CSR arrays,
+    so the cost is a linear copy rather than a rebuild and re-sort.
+    """
+    indptr = np.concatenate([matrix.indptr, np.full(n_rows - matrix.shape[0], matrix.indptr[-1])])
+    replacement = sparse.csr_matrix(replacement, dtype=matrix.dtype)
+    lengths = np.diff(indptr)
+    lengths[rows] = np.diff(replacement.indptr)
+    
+    indices, data = [], []
+    position = 0
+    for i, row in enumerate(rows):
+        indices += [matrix.indices[position:indptr[row]], replacement.indices[replacement.indptr[i]:replacement.indptr[i + 1]]]
+        data += [matrix.data[position:indptr[row]], replacement.data[replacement.indptr[i]:replacement.indptr[i + 1]]]
+        position = indptr[row + 1]
+    indices.append(matrix.indices[position:])
+    data.append(matrix.data[position:])
+    
+    return sparse.csr_matrix(
+        (np.concatenate(data), np.concatenate(indices), np.concatenate([[0], np.cumsum(lengths)])),
+        shape=(n_rows, replacement.shape[1])
+    )
+
+def _reserve_rows(state: 'RatingState', name: str, n_rows: int, fill=0) -> np.ndarray:
+    """
+    Writable buffer with room for n_rows rows holding the state's array name
+    in its first rows (rows after those set to fill).
+    
+    The buffer of the previous update is reused while it has room, so
+    updates write only the rows they change; a new buffer (the first update,
+    or when full) gets a quarter more rows than needed, making appended rows
+    amortised O(1).
+    """
+    array = getattr(state, name)
+    buffer = state.buffers.get(name)
+    if buffer is None or len(buffer) < n_rows:
+        buffer = np.empty((n_rows + max(n_rows // 4, 1024),) + array.shape[1:], dtype=array.dtype)
+        buffer[:len(array)] = array
+    buffer[len(array):n_rows] = fill
+    return buffer
+
+class RatingState:
+    """
+    The fitted state that add_interactions changes: the user index, rating
+    matrices, neighbour tables, user factors and the row norms of both
+    rating matrices (computed when not given).
+    
+    Updates build a new state and swap it in with a single attribute
+    assignment, so a reader that takes the state once per call always sees
+    one user index and one set of rating matrices. The row arrays
+    (neighbour tables, factors, norms) are views of buffers (buffers, keyed
+    by field) that later updates reuse: new rows are appended past the end
+    of the old views, but changed rows are rewritten in place, so a reader
+    of the old state may see a changed row's new values.
+    """
+    def __init__(self, user_index: pd.Index, user_item_matrix: sparse.csr_matrix, rating_counts: sparse.csr_matrix,
+                 item_user_matrix: sparse.csr_matrix, user_neighbors: np.ndarray, user_neighbor_scores: np.ndarray,
+                 item_neighbors: np.ndarray, item_neighbor_scores: np.ndarray, user_factors: np.ndarray,
+                 user_norms: np.ndarray = None, item_norms: np.ndarray = None, buffers: dict = None):
+        self.user_index = user_index
+        self.user_item_matrix = user_item_matrix
+        self.rating_counts = rating_counts
+        self.item_user_matrix = item_user_matrix
+        self.rated_matrix = rated_indicator(user_item_matrix)
+        self.user_neighbors = user_neighbors
+        self.user_neighbor_scores = user_neighbor_scores
+        self.item_neighbors = item_neighbors
+        self.item_neighbor_scores = item_neighbor_scores
+        self.user_factors = user_factors
+        self.user_norms = row_norms(user_item_matrix) if user_norms is None else user_norms
+        self.item_norms = row_norms(item_user_matrix) if item_norms is None else item_norms
+        self.buffers = buffers or {}
+
+def _state_field(name: str):
+    """
+    Read-only attribute backed by the published RatingState
+    """
+    return property(lambda self: getattr(self._state, name), doc=f"{name} of the published RatingState")
 
 class CollaborativeFilteringRecommender:
-    def __init__(self, data: pd.DataFrame):
+    user_index = _state_field('user_index')
+    user_item_matrix = _state_field('user_item_matrix')
+    rating_counts = _state_field('rating_counts')
+    item_user_matrix = _state_field('item_user_matrix')
+    rated_matrix = _state_field('rated_matrix')
+    user_neighbors = _state_field('user_neighbors')
+    user_neighbor_scores = _state_field('user_neighbor_scores')
+    item_neighbors = _state_field('item_neighbors')
+    item_neighbor_scores = _state_field('item_neighbor_scores')
+    user_factors = _state_field('user_factors')
+    
+    def __init__(self, data: pd.DataFrame, n_neighbors: int = 50, n_item_neighbors: int = 100,
+                 min_item_similarity: float = 0.1, catalog: ProductCatalog = None,
+                 svd_index_type: str = 'exact', n_jobs: int = None, factorization: str = 'svd',
+                 warm_start: 'CollaborativeFilteringRecommender' = None):
+        if factorization not in FACTORIZATION_METHODS:
+            raise ValueError(f"Unknown factorization '{factorization}', expected one of {FACTORIZATION_METHODS}")
         self.data = data
-        self.user_item_matrix = None
-        self.user_similarity = None
-        self.item_similarity = None
+        self.factorization = factorization
+        self.svd_index_type = svd_index_type
+        self.catalog = catalog if catalog is not None else ProductCatalog(data)
+        self.n_neighbors = n_neighbors
+        self.n_item_neighbors = n_item_neighbors
+        self.min_item_similarity = min_item_similarity
+        self.n_jobs = n_jobs or os.cpu_count()
+        self._state = None
+        self.item_index = None
+        self.item_catalog_rows = None
         self.svd_model = None
-        self._build_matrices()
+        self.als_model = None
+        self.factorization_stats = None
+        self.item_factors = None
+        self.svd_index = None
+        self._build_matrices(warm_start)
     
-    def _build_matrices(self):
+    def _build_matrices(self, warm_start: 'CollaborativeFilteringRecommender' = None):
         """Build user-item and similarity matrices"""
-        # Create user-item matrix
-        self.user_item_matrix = self.data.pivot_table(
-            index='ID', 
-            columns='ProdID', 
-            values='Rating', 
-            aggfunc='mean'
-        ).fillna(0)
+        # Average duplicate (user, product) ratings, keeping counts for incremental updates
+        ratings = self.data.groupby(['ID', 'ProdID'])['Rating'].agg(['mean', 'count'])
+        ratings = ratings[ratings['mean'] != 0]
+        
+        # Id <-> row/column index maps
+        user_index = pd.Index(ratings.index.get_level_values('ID').unique()).sort_values()
+        self.item_index = pd.Index(ratings.index.get_level_values('ProdID').unique()).sort_values()
+        
+        # Create sparse user-item matrix (users x products), only storing observed ratings
+        rows = user_index.get_indexer(ratings.index.get_level_values('ID'))
+        cols = self.item_index.get_indexer(ratings.index.get_level_values('ProdID'))
+        shape = (len(user_index), len(self.item_index))
+        user_item_matrix = sparse.csr_matrix((ratings['mean'].to_numpy(dtype=np.float32), (rows, cols)), shape=shape)
+        rating_counts = sparse.csr_matrix((ratings['count'].to_numpy(dtype=np.float32), (rows, cols)), shape=shape)
+        item_user_matrix = user_item_matrix.T.tocsr()
+        self.item_catalog_rows = self.catalog.rows_for_ids(self.item_index)
         
-        # Calculate user similarity
-        self.user_similarity = cosine_similarity(self.user_item_matrix)
+        # Top-K user and item neighbour tables (the full user x user and item x item matrices are never built)
+        user_neighbors, user_neighbor_scores = top_k_neighbors(user_item_matrix, self.n_neighbors, n_jobs=self.n_jobs)
+        item_neighbors, item_neighbor_scores = top_k_neighbors(
+            item_user_matrix, self.n_item_neighbors, self.min_item_similarity, n_jobs=self.n_jobs
+        )
         
-        # Calculate item similarity
-        self.item_similarity = cosine_similarity(self.user_item_matrix.T)
+        user_factors = self._fit_factors(user_item_matrix, warm_start)
+        self.svd_index = build_index(self.item_factors, self.svd_index_type)
+        self._state = RatingState(
+            user_index, user_item_matrix, rating_counts, item_user_matrix, user_neighbors, user_neighbor_scores,
+            item_neighbors, item_neighbor_scores, user_factors
+        )
+    
+    def _fit_factors(self, matrix: sparse.csr_matrix, warm_start: 'CollaborativeFilteringRecommender' = None) -> np.ndarray:
+        """
+        Factorize the rating matrix into user and item factors (returns the user factors).
+        
+        'svd' is a truncated SVD, which treats missing ratings as zeros; 'als'
+        fits the observed ratings only, warm-started from warm_start's ALS item
+        factors (matched by product ID) when the factor counts agree.
+        """
+        n_components = max(1, min(50, min(matrix.shape) - 1))
+        start = time.perf_counter()
+        if self.factorization == 'als':
+            self.als_model = ALSFactorizer(n_factors=n_components, n_threads=self.n_jobs)
+            self.als_model.fit(matrix, item_factors=self._warm_item_factors(warm_start, n_components))
+            user_factors = self.als_model.user_factors
+            self.item_factors = self.als_model.item_factors
+            stats = dict(self.als_model.stats)
+        else:
+            self.svd_model = TruncatedSVD(n_components=n_components, random_state=42)
+            user_factors = self.svd_model.fit_transform(matrix).astype(np.float32)
+            self.item_factors = np.ascontiguousarray(self.svd_model.components_.T, dtype=np.float32)
+            seconds = time.perf_counter() - start
+            stats = {'seconds': round(seconds, 3), 'ratings_per_second': round(matrix.nnz / seconds) if seconds > 0 else None}
+        
+        self.factorization_stats = {'method': self.factorization, 'ratings': int(matrix.nnz), **stats}
+        print(f"✅ Fitted {self.factorization.upper()} factors in {stats['seconds']:.2f}s ({stats['ratings_per_second']} ratings/s)")
+        return user_factors
+    
+    def _warm_item_factors(self, warm_start, n_factors: int):
+        """
+        Previous ALS item factors aligned to the current items (new items drawn at random), or None
+        """
+        if warm_start is None or warm_start.factorization != 'als' or warm_start.item_factors.shape[1] != n_factors:
+            return None
         
-        # Build SVD model for matrix factorization
-        self.svd_model = TruncatedSVD(n_components=50, random_state=42)
-        self.svd_model.fit(self.user_item_matrix)
+        rng = np.random.default_rng(42)
+        factors = rng.normal(scale=1 / np.sqrt(n_factors), size=(len(self.item_index), n_factors))
+        previous = warm_start.item_index.get_indexer(self.item_index)
+        factors[previous >= 0] = warm_start.item_factors[previous[previous >= 0]]
+        return factors
+    
+    def _get_user_idx(self, user_id: int, state: RatingState):
+        """
+        Map a user ID to its row in the user-item matrix, or None if unknown
+        """
+        user_idx = state.user_index.get_indexer([user_id])[0]
+        return None if user_idx < 0 else int(user_idx)
+    
+    def _get_user_ratings(self, user_idx: int, state: RatingState) -> np.ndarray:
+        """
+        Dense rating vector (one entry per product) for a single user row
+        """
+        return state.user_item_matrix[user_idx].toarray().ravel()
+    
+    def _get_product_details(self, item_idxs: np.ndarray):
+        """
+        Product details for ranked item columns, keeping the ranking order
+        """
+        return self.catalog.get_rows(self.item_catalog_rows[item_idxs])
+    
+    def _score_users(self, user_idxs: np.ndarray, state: RatingState) -> np.ndarray:
+        """
+        Neighbour-weighted scores for a block of users (one row per user).
+        
+        Each unrated item scores the mean of rating * similarity over the
+        user's top neighbours (from the neighbour table) who rated it; rated
+        or unreachable items are -inf.
+        """
+        n_users = len(state.user_index)
+        n_block = len(user_idxs)
+        
+        # Each user's stored top neighbours (padding is -1). A concurrent update may have rewritten
+        # the row in place with users added after this state, which are skipped.
+        neighbors = state.user_neighbors[user_idxs]
+        valid = (neighbors >= 0) & (neighbors < n_users)
+        rows = np.nonzero(valid)[0]
+        neighbors = neighbors[valid]
+        
+        # Sparse block x users weight / membership matrices for the neighbourhoods
+        shape = (n_block, n_users)
+        neighbor_weights = sparse.csr_matrix((state.user_neighbor_scores[user_idxs][valid], (rows, neighbors)), shape=shape)
+        neighbor_mask = sparse.csr_matrix((np.ones(rows.size, dtype=np.float32), (rows, neighbors)), shape=shape)
+        
+        # Sum of rating * similarity and number of contributing neighbours per item
+        weighted_sum = (neighbor_weights @ state.user_item_matrix).toarray()
+        counts = (neighbor_mask @ state.rated_matrix).toarray()
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(counts > 0, weighted_sum / counts, -np.inf)
+        
+        # Only recommend items the user has not rated yet
+        user_rated = state.user_item_matrix[user_idxs].tocoo()
+        scores[user_rated.row, user_rated.col] = -np.inf
+        return scores
+    
+    def user_based_rows(self, user_id: int, top_n: int = 10):
+        """
+        Catalog rows of the user-based recommendations, best first (None for unknown users)
+        """
+        state = self._state
+        user_idx = self._get_user_idx(user_id, state)
+        if user_idx is None:
+            return None
+        
+        scores = self._score_users(np.array([user_idx]), state)[0]
+        return self.item_catalog_rows[top_n_indices(scores, top_n)]
     
     def get_user_based_recommendations(self, user_id: int, top_n: int = 10):
         """
         Get recommendations based on similar users
         """
-        if user_id not in self.user_item_matrix.index:
+        rows = self.user_based_rows(user_id, top_n)
+        if rows is None:
             return pd.DataFrame()
         
-        # Get user index
-        user_idx = self.user_item_matrix.index.get_loc(user_id)
-        
-        # Get similar users
-        user_similarities = self.user_similarity[user_idx]
-        similar_users_idx = user_similarities.argsort()[::-1][1:51]  # Top 50 similar users
-        
-        # Get items rated by similar users but not by target user
-        user_ratings = self.user_item_matrix.iloc[user_idx]
-        recommendations = {}
-        
-        for similar_user_idx in similar_users_idx:
-            similar_user_ratings = self.user_item_matrix.iloc[similar_user_idx]
-            similarity_score = user_similarities[similar_user_idx]
-            
-            # Find items rated by similar user but not by target user
-            unrated_items = (similar_user_ratings > 0) & (user_ratings == 0)
-            
-            for item_idx in self.user_item_matrix.columns[unrated_items]:
-                item_id = item_idx
-                predicted_rating = similar_user_ratings[item_idx] * similarity_score
-                
-                if item_id not in recommendations:
-                    recommendations[item_id] = []
-                recommendations[item_id].append(predicted_rating)
-        
-        # Calculate average predicted ratings
-        final_recommendations = []
-        for item_id, ratings in recommendations.items():
-            avg_rating = np.mean(ratings)
-            final_recommendations.append((item_id, avg_rating))
-        
-        # Sort by predicted rating
-        final_recommendations.sort(key=lambda x: x[1], reverse=True)
+        # Return product details
+        return self.catalog.get_rows(rows)
+    
+    def recommend_many_rows(self, user_ids, top_n: int = 10, method: str = 'user_based', block_size: int = 1024):
+        """
+        Catalog rows of the recommendations for many users at once.
         
-        # Get top N recommendations
-        top_item_ids = [item_id for item_id, _ in final_recommendations[:top_n]]
+        method is 'user_based' or 'svd'. Users are scored in blocks of
+        block_size with one matrix product per block (SVD with an approximate
+        index searches it per user instead, as svd_rows does). Returns a dict of
+        user_id -> rows (None for unknown users).
+        """
+        scorers = {'user_based': self._score_users, 'svd': self._score_svd}
+        if method not in scorers:
+            raise ValueError(f"Unknown method '{method}', expected one of {list(scorers)}")
+        score_block = scorers[method]
         
-        # Return product details
-        recommended_products = self.data[self.data['ProdID'].isin(top_item_ids)][
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].drop_duplicates().head(top_n)
+        state = self._state
+        user_ids = list(user_ids)
+        user_idxs = state.user_index.get_indexer(user_ids)
+        results = {user_id: None for user_id, user_idx in zip(user_ids, user_idxs) if user_idx < 0}
+        
+        known = [(user_id, user_idx) for user_id, user_idx in zip(user_ids, user_idxs) if user_idx >= 0]
+        if method == 'svd' and self.svd_index_type != 'exact':
+            # Same approximate search as svd_rows, so batch and live results agree
+            for user_id, user_idx in known:
+                results[user_id] = self.item_catalog_rows[self._search_svd(user_idx, top_n, state)]
+            return results
+        
+        for start in range(0, len(known), block_size):
+            block = known[start:start + block_size]
+            scores = score_block(np.array([user_idx for _, user_idx in block]), state)
+            for (user_id, _), user_scores in zip(block, scores):
+                results[user_id] = self.item_catalog_rows[top_n_indices(user_scores, top_n)]
         
-        return recommended_products.reset_index(drop=True)
+        return results
+    
+    def recommend_many(self, user_ids, top_n: int = 10, method: str = 'user_based', block_size: int = 1024):
+        """
+        Get recommendations for many users at once.
+        
+        Same scoring as recommend_many_rows; returns a dict of user_id ->
+        DataFrame (empty for unknown users).
+        """
+        results = self.recommend_many_rows(user_ids, top_n, method, block_size)
+        return {
+            user_id: pd.DataFrame() if rows is None else self.catalog.get_rows(rows)
+            for user_id, rows in results.items()
+        }
     
     def get_item_based_recommendations(self, user_id: int, top_n: int = 10):
         """
         Get recommendations based on item similarity
         """
-        if user_id not in self.user_item_matrix.index:
+        state = self._state
+        user_idx = self._get_user_idx(user_id, state)
+        if user_idx is None:
             return pd.DataFrame()
         
-        # Get user's rated items
-        user_ratings = self.user_item_matrix.loc[user_id]
-        rated_items = user_ratings[user_ratings > 0].index
-        
-        recommendations = {}
-        
-        for item_id in rated_items:
-            item_idx = list(self.user_item_matrix.columns).index(item_id)
-            item_similarities = self.item_similarity[item_idx]
-            
-            # Find similar items not rated by user
-            for similar_item_idx, similarity_score in enumerate(item_similarities):
-                similar_item_id = self.user_item_matrix.columns[similar_item_idx]
-                
-                if similar_item_id not in rated_items and similarity_score > 0.1:
-                    predicted_rating = user_ratings[item_id] * similarity_score
-                    
-                    if similar_item_id not in recommendations:
-                        recommendations[similar_item_id] = []
-                    recommendations[similar_item_id].append(predicted_rating)
-        
-        # Calculate average predicted ratings
-        final_recommendations = []
-        for item_id, ratings in recommendations.items():
-            avg_rating = np.mean(ratings)
-            final_recommendations.append((item_id, avg_rating))
-        
-        # Sort by predicted rating
-        final_recommendations.sort(key=lambda x: x[1], reverse=True)
+        # Get user's rated items and their neighbour lists
+        user_row = state.user_item_matrix[user_idx]
+        neighbors = state.item_neighbors[user_row.indices]
+        predicted = user_row.data[:, None] * state.item_neighbor_scores[user_row.indices]
+        
+        # Accumulate rating * similarity over similar items not rated by user
+        n_items = len(self.item_index)
+        valid = neighbors >= 0
+        valid[valid] = self._get_user_ratings(user_idx, state)[neighbors[valid]] == 0
+        totals = np.bincount(neighbors[valid], weights=predicted[valid], minlength=n_items)
+        counts = np.bincount(neighbors[valid], minlength=n_items)
+        
+        # Average predicted ratings
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(counts > 0, totals / counts, -np.inf)
         
         # Get top N recommendations
-        top_item_ids = [item_id for item_id, _ in final_recommendations[:top_n]]
+        top_items = top_n_indices(scores, top_n)
         
         # Return product details
-        recommended_products = self.data[self.data['ProdID'].isin(top_item_ids)][
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].drop_duplicates().head(top_n)
+        return self._get_product_details(top_items)
+    
+    def _score_svd(self, user_idxs: np.ndarray, state: RatingState) -> np.ndarray:
+        """
+        Predicted ratings from the (SVD or ALS) factors for a block of users (one GEMM); rated items are -inf
+        """
+        scores = state.user_factors[user_idxs] @ self.item_factors.T
         
-        return recommended_products.reset_index(drop=True)
+        # Only recommend items the user has not rated yet
+        user_rated = state.user_item_matrix[user_idxs].tocoo()
+        scores[user_rated.row, user_rated.col] = -np.inf
+        return scores
+    
+    def svd_rows(self, user_id: int, top_n: int = 10):
+        """
+        Catalog rows of the SVD recommendations, best first (None for unknown users)
+        """
+        state = self._state
+        user_idx = self._get_user_idx(user_id, state)
+        if user_idx is None:
+            return None
+        
+        if self.svd_index_type == 'exact':
+            # Predict ratings for all unrated items
+            scores = self._score_svd(np.array([user_idx]), state)[0]
+            top_items = top_n_indices(scores, top_n)
+        else:
+            top_items = self._search_svd(user_idx, top_n, state)
+        
+        return self.item_catalog_rows[top_items]
+    
+    def _search_svd(self, user_idx: int, top_n: int, state: RatingState) -> np.ndarray:
+        """
+        Approximate search over the item factors, skipping already rated items
+        """
+        rated = state.user_item_matrix[user_idx].indices
+        top_items, _ = self.svd_index.search(state.user_factors[user_idx], top_n, exclude=rated)
+        return top_items
     
     def get_svd_recommendations(self, user_id: int, top_n: int = 10):
         """
         Get recommendations using SVD matrix factorization
         """
-        if user_id not in self.user_item_matrix.index:
+        rows = self.svd_rows(user_id, top_n)
+        if rows is None:
             return pd.DataFrame()
         
-        # Get user index
-        user_idx = self.user_item_matrix.index.get_loc(user_id)
+        # Return product details
+        return self.catalog.get_rows(rows)
+    
+    def add_interactions(self, interactions: pd.DataFrame):
+        """
+        Fold new (ID, ProdID, Rating) interactions into the fitted model without a refit.
         
-        # Predict ratings for all items
-        user_factors = self.svd_model.transform(self.user_item_matrix.iloc[[user_idx]])
-        item_factors = self.svd_model.components_
+        Ratings are merged into the per-pair means of the affected users, whose
+        rows (and the affected items' rows of the transpose) are spliced into
+        the rating matrices; the neighbour lists of affected users and items
+        are updated, and the factors of affected (including new) users are
+        re-folded against the existing item factors. Products unknown to the
+        model are skipped. Only the neighbour lists a changed row enters or
+        leaves are re-selected, and the row arrays grow in place (see
+        RatingState), so an update costs the changed rows plus one copy of the
+        rating matrices' CSR arrays. The updated state is published in one
+        step once it is complete. Returns (number of interactions applied, number of new users).
+        """
+        state = self._state
+        known = self.item_index.get_indexer(interactions['ProdID']) >= 0
+        interactions = interactions[known & (interactions['Rating'].to_numpy() != 0)]
+        cols = self.item_index.get_indexer(interactions['ProdID'])
+        if len(interactions) == 0:
+            return 0, 0
         
-        predicted_ratings = np.dot(user_factors, item_factors)[0]
+        # Extend the user index map with unseen users
+        user_ids = interactions['ID'].to_numpy()
+        new_user_ids = pd.Index(user_ids).unique().difference(state.user_index)
+        user_index = state.user_index.append(new_user_ids) if len(new_user_ids) else state.user_index
+        rows = user_index.get_indexer(user_ids)
+        n_users, n_items = len(user_index), len(self.item_index)
+        changed_users = np.unique(rows)
+        changed_items = np.unique(cols)
         
-        # Get items not rated by user
-        user_ratings = self.user_item_matrix.iloc[user_idx]
-        unrated_items = user_ratings[user_ratings == 0].index
+        # Merge ratings into the running (user, product) means of the changed users' rows only;
+        # both matrices share one sparsity pattern
+        existing = changed_users[changed_users < len(state.user_index)]
+        old = state.user_item_matrix[existing].tocoo()
+        old_counts = state.rating_counts[existing].tocoo().data
+        block_rows = np.concatenate([np.searchsorted(changed_users, existing[old.row]), np.searchsorted(changed_users, rows)])
+        block_cols = np.concatenate([old.col, cols])
+        shape = (len(changed_users), n_items)
+        sums = sparse.csr_matrix(
+            (np.concatenate([old.data * old_counts, interactions['Rating'].to_numpy(dtype=np.float32)]), (block_rows, block_cols)),
+            shape=shape
+        )
+        counts = sparse.csr_matrix(
+            (np.concatenate([old_counts, np.ones(len(rows), dtype=np.float32)]), (block_rows, block_cols)),
+            shape=shape
+        )
+        means = sums.copy()
+        means.data = sums.data / counts.data
+        user_item_matrix = _replace_rows(state.user_item_matrix, changed_users, means, n_users)
+        rating_counts = _replace_rows(state.rating_counts, changed_users, counts, n_users)
         
-        # Create recommendations list
-        recommendations = []
-        for item_id in unrated_items:
-            item_idx = list(self.user_item_matrix.columns).index(item_id)
-            predicted_rating = predicted_ratings[item_idx]
-            recommendations.append((item_id, predicted_rating))
+        # The changed items' rows of the transpose: other users' ratings plus the changed users' new means
+        others = state.item_user_matrix[changed_items].tocoo()
+        keep = ~np.isin(others.col, changed_users)
+        updated = means.tocoo()
+        mask = np.isin(updated.col, changed_items)
+        item_block = sparse.csr_matrix((
+            np.concatenate([others.data[keep], updated.data[mask]]),
+            (np.concatenate([others.row[keep], np.searchsorted(changed_items, updated.col[mask])]),
+             np.concatenate([others.col[keep], changed_users[updated.row[mask]]]))
+        ), shape=(len(changed_items), n_users))
+        item_user_matrix = _replace_rows(state.item_user_matrix, changed_items, item_block, n_items)
         
-        # Sort by predicted rating
-        recommendations.sort(key=lambda x: x[1], reverse=True)
+        # Row arrays are updated in place in reused buffers: only changed rows are written
+        buffers = {
+            name: _reserve_rows(state, name, n_rows, fill)
+            for name, n_rows, fill in [
+                ('user_norms', n_users, 0), ('item_norms', n_items, 0), ('user_factors', n_users, 0),
+                ('user_neighbors', n_users, -1), ('user_neighbor_scores', n_users, 0),
+                ('item_neighbors', n_items, -1), ('item_neighbor_scores', n_items, 0),
+            ]
+        }
+        rows = {
+            name: buffer[:n_users if name.startswith('user_') else n_items]
+            for name, buffer in buffers.items()
+        }
         
-        # Get top N recommendations
-        top_item_ids = [item_id for item_id, _ in recommendations[:top_n]]
+        # Only the changed rows need new norms
+        rows['user_norms'][changed_users] = row_norms(means)
+        rows['item_norms'][changed_items] = row_norms(item_block)
         
-        # Return product details
-        recommended_products = self.data[self.data['ProdID'].isin(top_item_ids)][
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].drop_duplicates().head(top_n)
+        # Refresh only the affected neighbour lists
+        update_top_k_neighbors(
+            rows['user_neighbors'], rows['user_neighbor_scores'], user_item_matrix, changed_users,
+            transposed=item_user_matrix, norms=rows['user_norms']
+        )
+        update_top_k_neighbors(
+            rows['item_neighbors'], rows['item_neighbor_scores'], item_user_matrix, changed_items,
+            self.min_item_similarity, transposed=user_item_matrix, norms=rows['item_norms']
+        )
+        
+        # Fold affected users into the factor space: an ALS user solve, or the SVD transform (X @ components_.T)
+        if self.factorization == 'als':
+            rows['user_factors'][changed_users] = self.als_model.solve(means, self.item_factors)[0]
+        else:
+            rows['user_factors'][changed_users] = means @ self.item_factors
         
-        return recommended_products.reset_index(drop=True)
+        self._state = RatingState(
+            user_index, user_item_matrix, rating_counts, item_user_matrix, rows['user_neighbors'],
+            rows['user_neighbor_scores'], rows['item_neighbors'], rows['item_neighbor_scores'], rows['user_factors'],
+            rows['user_norms'], rows['item_norms'], buffers
+        )
+        return len(interactions), len(new_user_ids)
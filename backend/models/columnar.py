@@ -0,0 +1,118 @@
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Name of the file in a root directory holding its current version's name
+LATEST_FILE = 'LATEST'
+
+def stage_version(root_dir: str):
+    """
+    New version name and the empty staging directory to write it into under root_dir
+    """
+    os.makedirs(root_dir, exist_ok=True)
+    version = time.strftime('v%Y%m%d-%H%M%S')
+    if os.path.exists(os.path.join(root_dir, version)):
+        version += f'-{os.getpid()}-{time.time_ns() % 1000000}'
+    staging = os.path.join(root_dir, version) + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return version, staging
+
+def publish_version(root_dir: str, version: str, staging: str) -> str:
+    """
+    Make a finished staging directory root_dir's current version; returns the version directory
+    """
+    # Publish atomically: rename the finished directory, then swap the LATEST pointer
+    directory = os.path.join(root_dir, version)
+    os.rename(staging, directory)
+    latest_tmp = os.path.join(root_dir, LATEST_FILE + '.tmp')
+    with open(latest_tmp, 'w') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(root_dir, LATEST_FILE))
+    return directory
+
+def latest_version(root_dir: str) -> str:
+    """
+    Directory of root_dir's current version (FileNotFoundError if none was published)
+    """
+    with open(os.path.join(root_dir, LATEST_FILE)) as f:
+        return os.path.join(root_dir, f.read().strip())
+
+def save_array(directory: str, name: str, array):
+    np.save(os.path.join(directory, f'{name}.npy'), np.asarray(array))
+
+def load_array(directory: str, name: str) -> np.ndarray:
+    # Copy-on-write mapping: pages are read lazily and never written back to disk
+    return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='c')
+
+def save_sparse(directory: str, name: str, matrix):
+    matrix = sparse.csr_matrix(matrix)
+    save_array(directory, f'{name}.data', matrix.data)
+    save_array(directory, f'{name}.indices', matrix.indices)
+    save_array(directory, f'{name}.indptr', matrix.indptr)
+    save_array(directory, f'{name}.shape', np.array(matrix.shape, dtype=np.int64))
+
+def load_sparse(directory: str, name: str):
+    return sparse.csr_matrix(
+        (
+            load_array(directory, f'{name}.data'),
+            load_array(directory, f'{name}.indices'),
+            load_array(directory, f'{name}.indptr'),
+        ),
+        shape=tuple(load_array(directory, f'{name}.shape')),
+        copy=False
+    )
+
+def save_strings(directory: str, name: str, values):
+    """
+    Store a string column as int32 codes plus a NUL-separated UTF-8 blob of the distinct values
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype(object))
+    blob = '\x00'.join(str(value) for value in uniques).encode('utf-8')
+    save_array(directory, f'{name}.codes', codes.astype(np.int32))
+    save_array(directory, f'{name}.blob', np.frombuffer(blob, dtype=np.uint8))
+
+def load_strings(directory: str, name: str) -> np.ndarray:
+    blob = load_array(directory, f'{name}.blob').tobytes().decode('utf-8')
+    uniques = blob.split('\x00') if blob else []
+    # Trailing NaN so that missing values (code -1) decode to NaN
+    uniques = np.array(uniques + [np.nan], dtype=object)
+    return uniques[load_array(directory, f'{name}.codes')]
+
+def save_frame(directory: str, name: str, frame: pd.DataFrame) -> list:
+    """
+    Store every column of a DataFrame as .npy files; returns the column
+    descriptions that load_frame needs (keep them in a manifest)
+    """
+    columns = []
+    for column in frame.columns:
+        field = f'{name}.{len(columns)}'
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            save_array(directory, f'{field}.codes', frame[column].cat.codes.to_numpy())
+            save_strings(directory, f'{field}.categories', frame[column].cat.categories.to_numpy())
+            columns.append({'name': column, 'kind': 'category'})
+        elif pd.api.types.is_numeric_dtype(frame[column]):
+            save_array(directory, field, frame[column].to_numpy())
+            columns.append({'name': column, 'kind': 'numeric'})
+        else:
+            save_strings(directory, field, frame[column].to_numpy())
+            columns.append({'name': column, 'kind': 'string'})
+    return columns
+
+def load_frame(directory: str, name: str, columns: list) -> pd.DataFrame:
+    values = {}
+    for position, column in enumerate(columns):
+        field = f'{name}.{position}'
+        if column['kind'] == 'category':
+            values[column['name']] = pd.Categorical.from_codes(
+                np.asarray(load_array(directory, f'{field}.codes')),
+                categories=load_strings(directory, f'{field}.categories')
+            )
+        elif column['kind'] == 'numeric':
+            values[column['name']] = np.asarray(load_array(directory, field))
+        else:
+            values[column['name']] = load_strings(directory, field)
+    return pd.DataFrame(values)
@@ -1,84 +1,117 @@
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+from .similarity import top_n_indices, top_k_neighbors
+from .catalog import ProductCatalog
+from .ann import build_index
 
 class ContentBasedRecommender:
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, n_neighbors: int = None, catalog: ProductCatalog = None,
+                 index_type: str = 'exact', lsa_components: int = 100):
+        """
+        n_neighbors=None computes similarities on demand from the sparse
+        TF-IDF matrix; an int precomputes a top-K neighbour table instead.
+        index_type='ivf' searches an approximate index over LSA-reduced vectors.
+        """
         self.data = data
+        self.catalog = catalog if catalog is not None else ProductCatalog(data)
+        self.n_neighbors = n_neighbors
+        self.index_type = index_type
+        self.lsa_components = lsa_components
+        self.vectorizer = None
         self.tfidf_matrix = None
-        self.cosine_sim = None
+        self.lsa_vectors = None
+        self.index = None
+        self.neighbors = None
+        self.neighbor_scores = None
         self._build_model()
     
     def _build_model(self):
-        """Build the TF-IDF and cosine similarity model"""
+        """Build the product-level TF-IDF model (and optional neighbour table)"""
+        # Interactions repeat product rows; the text model works on catalog rows
+        products = self.catalog.products
+        
         # Combine relevant text features for better recommendations
-        self.data['combined_features'] = (
-            self.data['Category'] + ' ' + 
-            self.data['Brand'] + ' ' + 
-            self.data['Tags'] + ' ' + 
-            self.data['Description'].fillna('')
+        combined_features = (
+            products['Category'].astype(str) + ' ' + 
+            products['Brand'].astype(str) + ' ' + 
+            products['Tags'] + ' ' + 
+            products['Description'].fillna('')
         )
         
-        # Create TF-IDF matrix
-        tfidf_vectorizer = TfidfVectorizer(
+        # Create TF-IDF matrix (rows are L2-normalized, so a dot product is the cosine)
+        self.vectorizer = TfidfVectorizer(
             stop_words='english',
             max_features=5000,
             ngram_range=(1, 2)
         )
-        self.tfidf_matrix = tfidf_vectorizer.fit_transform(self.data['combined_features'])
+        self.tfidf_matrix = self.vectorizer.fit_transform(combined_features).tocsr()
+        
+        if self.n_neighbors is not None:
+            self.neighbors, self.neighbor_scores = top_k_neighbors(self.tfidf_matrix, self.n_neighbors)
+        
+        if self.index_type != 'exact':
+            # LSA-reduce the TF-IDF vectors, re-normalized so inner product is cosine
+            n_components = max(1, min(self.lsa_components, min(self.tfidf_matrix.shape) - 1))
+            lsa = TruncatedSVD(n_components=n_components, random_state=42)
+            self.lsa_vectors = normalize(lsa.fit_transform(self.tfidf_matrix)).astype(np.float32)
+            self.index = build_index(self.lsa_vectors, self.index_type)
+    
+    def _similar_products(self, product_idx: int, top_n: int):
+        """
+        Top-N (product row, similarity) pairs for a product, excluding itself
+        """
+        if self.neighbors is not None and top_n <= self.neighbors.shape[1]:
+            neighbors = self.neighbors[product_idx]
+            valid = neighbors >= 0
+            return neighbors[valid][:top_n], self.neighbor_scores[product_idx][valid][:top_n]
+        
+        if self.index is not None:
+            return self.index.search(self.lsa_vectors[product_idx], top_n, exclude=[product_idx])
         
-        # Calculate cosine similarity
-        self.cosine_sim = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+        # Cosine similarity of one product against all products, straight from the sparse matrix
+        similarities = (self.tfidf_matrix @ self.tfidf_matrix[product_idx].T).toarray().ravel()
+        similarities[product_idx] = -np.inf
+        top_indices = top_n_indices(similarities, top_n)
+        return top_indices, similarities[top_indices]
+    
+    def similar_rows(self, product_name: str, top_n: int = 10):
+        """
+        (catalog rows, similarities) of the products most similar to a product, or None if unknown
+        """
+        product_idx = self.catalog.row_for_name(product_name)
+        if product_idx is None:
+            return None
+        return self._similar_products(product_idx, top_n)
     
     def get_recommendations(self, product_name: str, top_n: int = 10):
         """
         Get content-based recommendations for a product
         """
-        if product_name not in self.data['Name'].values:
-            return pd.DataFrame()
-        
-        # Get the index of the product
-        product_indices = self.data[self.data['Name'] == product_name].index
-        if len(product_indices) == 0:
+        similar = self.similar_rows(product_name, top_n)
+        if similar is None:
             return pd.DataFrame()
         
-        product_idx = product_indices[0]
-        
-        # Get similarity scores
-        sim_scores = list(enumerate(self.cosine_sim[product_idx]))
-        
-        # Sort by similarity score
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        
-        # Get top N similar products (excluding the product itself)
-        top_indices = [i[0] for i in sim_scores[1:top_n+1]]
+        top_indices, sim_scores = similar
         
         # Return recommended products with relevant details
-        recommendations = self.data.iloc[top_indices][
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].copy()
+        recommendations = self.catalog.get_rows(top_indices)
         
         # Add similarity scores
-        recommendations['similarity_score'] = [sim_scores[i][1] for i in range(1, len(top_indices)+1)]
+        recommendations['similarity_score'] = sim_scores
         
-        return recommendations.reset_index(drop=True)
+        return recommendations
     
     def get_recommendations_by_category(self, category: str, top_n: int = 10):
         """
         Get recommendations from a specific category
         """
-        category_products = self.data[self.data['Category'].str.contains(category, case=False, na=False)]
+        # Best products by rating and review count among matching categories
+        recommendations = self.catalog.top_rated(top_n, category=category)
         
-        if len(category_products) == 0:
+        if len(recommendations) == 0:
             return pd.DataFrame()
         
-        # Sort by rating and review count
-        recommendations = category_products.sort_values(
-            ['Rating', 'ReviewCount'], 
-            ascending=[False, False]
-        ).head(top_n)
-        
-        return recommendations[
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].reset_index(drop=True)
+        return recommendations
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+class FacetIndex:
+    """
+    Product lists per value of one attribute (e.g. Category), presorted by rank.
+    
+    rank_order maps rank position -> catalog row (best product first). Each
+    value's list holds ascending rank positions, so any prefix of it is that
+    value's best products.
+    """
+    def __init__(self, values, rank_order: np.ndarray):
+        values = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+        self.labels = np.asarray(values.categories, dtype=object)
+        self.ranked_codes = np.asarray(values.codes)[rank_order]
+        
+        # Group rank positions by value; a stable sort keeps each group in rank order
+        order = np.argsort(self.ranked_codes, kind='stable')
+        self.positions = order[self.ranked_codes[order] >= 0]
+        self.counts = np.bincount(self.ranked_codes[self.ranked_codes >= 0], minlength=len(self.labels))
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+    
+    def matching_labels(self, query: str) -> np.ndarray:
+        """
+        Codes of the values containing query, case-insensitively
+        """
+        query = query.lower()
+        return np.flatnonzero([query in str(label).lower() for label in self.labels])
+    
+    def positions_for(self, codes) -> np.ndarray:
+        """
+        Ascending rank positions of the products having any of the given value codes
+        """
+        if len(codes) == 1:
+            code = codes[0]
+            return self.positions[self.offsets[code]:self.offsets[code + 1]]
+        selected = np.zeros(len(self.labels) + 1, dtype=bool)
+        selected[codes] = True
+        # Code -1 (missing) indexes the trailing False
+        return np.flatnonzero(selected[self.ranked_codes])
+
+def intersect_sorted(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Intersection of two ascending arrays, probing the longer with the shorter
+    """
+    if len(left) > len(right):
+        left, right = right, left
+    if not len(left):
+        return left
+    found = np.minimum(np.searchsorted(right, left), len(right) - 1)
+    return left[right[found] == left]
@@ -0,0 +1,138 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+
+FACTORIZATION_METHODS = ['svd', 'als']
+
+def _length_blocks(counts: np.ndarray, max_entries: int) -> list:
+    """
+    Group the non-empty rows, ordered by length, into blocks whose padded size
+    (rows x longest row) stays within max_entries (a longer row gets a block of its own)
+    """
+    order = np.flatnonzero(counts)
+    order = order[np.argsort(counts[order], kind='stable')]
+    blocks = []
+    start = 0
+    while start < len(order):
+        stop = min(len(order), start + max(1, max_entries // counts[order[start]]))
+        while stop - start > 1 and counts[order[stop - 1]] * (stop - start) > max_entries:
+            stop = start + max(1, max_entries // counts[order[stop - 1]])
+        blocks.append(order[start:stop])
+        start = stop
+    return blocks
+
+class ALSFactorizer:
+    """
+    Alternating least squares over the observed entries of a sparse rating matrix.
+    
+    Missing ratings are unknown rather than zero: each row's factors solve a
+    ridge regression on that row's stored ratings only (weighted-lambda
+    regularization, scaled by the row's rating count). Rows of similar length
+    are solved together as batched matrix products, in blocks of about
+    block_entries padded ratings on n_threads threads, so a pass costs
+    O(nnz * k^2) and never materializes the users x items matrix. Training
+    stops after max_iterations or once the regularized loss improves by less
+    than tolerance (relative).
+    """
+    def __init__(self, n_factors: int = 50, regularization: float = 0.1, max_iterations: int = 15,
+                 tolerance: float = 1e-3, random_state: int = 42, n_threads: int = None, block_entries: int = 2048):
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.random_state = random_state
+        self.n_threads = n_threads
+        self.block_entries = block_entries
+        self.user_factors = None
+        self.item_factors = None
+        self.stats = None
+    
+    def _solve_block(self, matrix: sparse.csr_matrix, fixed: np.ndarray, rows: np.ndarray):
+        """
+        Least-squares factors for the given rows of matrix with the other side's
+        factors held fixed, plus the squared error of the new factors on those rows
+        """
+        # Pad the rows' ratings to the longest one so the normal equations are batched matrix products
+        counts = np.diff(matrix.indptr)[rows]
+        padded = np.arange(counts.max()) < counts[:, None]
+        positions = (matrix.indptr[rows][:, None] + np.arange(counts.max()))[padded]
+        observed = np.zeros(padded.shape + (fixed.shape[1],))
+        observed[padded] = fixed[matrix.indices[positions]]
+        values = np.zeros(padded.shape)
+        values[padded] = matrix.data[positions]
+        
+        # Per row: (Y^T Y + lambda * n * I) x = Y^T r over that row's rated columns only
+        transposed = observed.transpose(0, 2, 1)
+        gram = transposed @ observed
+        gram += (self.regularization * counts)[:, None, None] * np.eye(fixed.shape[1])
+        factors = np.linalg.solve(gram, transposed @ values[:, :, None])
+        
+        residuals = values - (observed @ factors)[:, :, 0]
+        return factors[:, :, 0], float(np.sum(residuals[padded] ** 2))
+    
+    def solve(self, matrix, fixed: np.ndarray):
+        """
+        Factors for every row of matrix with the other side's factors held fixed
+        (one ALS half-step; also folds new or updated users into a fitted model).
+        Rows without ratings get zero factors. Returns (factors, squared error
+        over the stored ratings).
+        """
+        matrix = sparse.csr_matrix(matrix)
+        fixed = np.asarray(fixed, dtype=np.float64)
+        blocks = _length_blocks(np.diff(matrix.indptr), self.block_entries)
+        with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+            results = list(pool.map(lambda rows: self._solve_block(matrix, fixed, rows), blocks))
+        
+        factors = np.zeros((matrix.shape[0], fixed.shape[1]))
+        for rows, (block_factors, _) in zip(blocks, results):
+            factors[rows] = block_factors
+        return factors, sum(error for _, error in results)
+    
+    def _loss(self, error: float, matrix, transposed, user_factors: np.ndarray, item_factors: np.ndarray) -> float:
+        """
+        Regularized objective that each ALS half-step decreases
+        """
+        penalty = np.diff(matrix.indptr) @ np.sum(user_factors ** 2, axis=1)
+        penalty += np.diff(transposed.indptr) @ np.sum(item_factors ** 2, axis=1)
+        return error + self.regularization * penalty
+    
+    def fit(self, matrix, item_factors: np.ndarray = None):
+        """
+        Fit user and item factors to the stored ratings of a users x items matrix.
+        
+        item_factors warm-starts training (e.g. from the previous model, aligned
+        to the current item columns); user factors are solved from them first,
+        so they need no initial value.
+        """
+        matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        transposed = matrix.T.tocsr()
+        if item_factors is None:
+            rng = np.random.default_rng(self.random_state)
+            item_factors = rng.normal(scale=1 / np.sqrt(self.n_factors), size=(matrix.shape[1], self.n_factors))
+        item_factors = np.asarray(item_factors, dtype=np.float64)
+        
+        start = time.perf_counter()
+        loss = None
+        converged = False
+        iterations = 0
+        while iterations < self.max_iterations and not converged:
+            user_factors, _ = self.solve(matrix, item_factors)
+            item_factors, error = self.solve(transposed, user_factors)
+            iterations += 1
+            
+            previous, loss = loss, self._loss(error, matrix, transposed, user_factors, item_factors)
+            converged = previous is not None and previous - loss < self.tolerance * previous
+        seconds = time.perf_counter() - start
+        rmse = np.sqrt(error / max(matrix.nnz, 1)) if iterations else None
+        
+        self.user_factors = user_factors.astype(np.float32)
+        self.item_factors = item_factors.astype(np.float32)
+        self.stats = {
+            'iterations': iterations,
+            'converged': bool(converged),
+            'rmse': round(float(rmse), 6) if rmse is not None else None,
+            'seconds': round(seconds, 3),
+            'ratings_per_second': round(matrix.nnz * iterations / seconds) if seconds > 0 else None,
+        }
+        return self
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Weight of each candidate source, reported as the confidence of its items
+SOURCE_WEIGHTS = {
+    'collaborative': 0.8,
+    'svd': 0.75,
+    'content_based': 0.7,
+    'category_based': 0.6,
+    'top_rated': 0.5,
+}
+
+FUSION_METHODS = ['weighted', 'rrf']
+
+def _flatten(candidates: list):
+    """
+    Concatenate (source, rows) lists into row, source position, weight and rank arrays
+    """
+    rows = np.concatenate([rows for _, rows in candidates]).astype(np.int64)
+    sources = np.repeat(np.arange(len(candidates)), [len(rows) for _, rows in candidates])
+    weights = np.repeat([SOURCE_WEIGHTS[source] for source, _ in candidates], [len(rows) for _, rows in candidates])
+    ranks = np.concatenate([np.arange(1, len(rows) + 1) for _, rows in candidates])
+    return rows, sources, weights, ranks
+
+def weighted_fusion(candidates: list, name_codes: np.ndarray, ratings: np.ndarray, top_n: int):
+    """
+    Keep each product's first occurrence (by name, in source order), then rank
+    by source weight and product rating. Returns (rows, source positions, scores).
+    """
+    rows, sources, weights, _ = _flatten(candidates)
+    _, first = np.unique(name_codes[rows], return_index=True)
+    keep = np.sort(first)
+    rows, sources, weights = rows[keep], sources[keep], weights[keep]
+    
+    # Stable: equal weight and rating keep source order
+    order = np.lexsort((np.arange(len(rows)), -ratings[rows], -weights))[:top_n]
+    return rows[order], sources[order], weights[order]
+
+def reciprocal_rank_fusion(candidates: list, name_codes: np.ndarray, ratings: np.ndarray, top_n: int, k: int = 60):
+    """
+    Score each product (by name) with sum(weight / (k + rank)) over the lists
+    it appears in, normalized so an item ranked first everywhere scores 1.
+    Each product is attributed to its strongest source. Returns (rows, source positions, scores).
+    """
+    rows, sources, weights, ranks = _flatten(candidates)
+    contributions = weights / (k + ranks)
+    _, first, inverse = np.unique(name_codes[rows], return_index=True, return_inverse=True)
+    fused = np.bincount(inverse, weights=contributions)
+    fused /= sum(SOURCE_WEIGHTS[source] for source, _ in candidates) / (k + 1)
+    
+    # Strongest contribution per product (earliest list on ties)
+    strongest = np.lexsort((np.arange(len(rows)), -contributions, inverse))
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(inverse[strongest]) != 0]))
+    best = strongest[starts]
+    
+    product_rows = rows[first]
+    order = np.lexsort((first, -ratings[product_rows], -fused))[:top_n]
+    return product_rows[order], sources[best][order], fused[order]
+
+def fuse(candidates: list, name_codes: np.ndarray, ratings: np.ndarray, top_n: int, method: str = 'weighted'):
+    """
+    Fuse ranked (source, catalog rows) candidate lists into the top-N
+    (rows, source positions, scores) with 'weighted' or 'rrf' fusion
+    """
+    if method == 'weighted':
+        return weighted_fusion(candidates, name_codes, ratings, top_n)
+    if method == 'rrf':
+        return reciprocal_rank_fusion(candidates, name_codes, ratings, top_n)
+    raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
@@ -1,85 +1,387 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from .content_based_filtering import ContentBasedRecommender
 from .collaborative_filtering import CollaborativeFilteringRecommender
+from .catalog import ProductCatalog
+from .profiles import UserProfiles
+from .fusion import fuse, SOURCE_WEIGHTS
+
+# Runs the candidate sources of hybrid recommendations concurrently. Each hybrid
+# call submits 3 sources, so the pool holds 3 threads per request worker
+# (WorkerPool defaults to one worker per CPU) and no call waits behind another's.
+_source_pool = ThreadPoolExecutor(max_workers=3 * (os.cpu_count() or 1), thread_name_prefix='hybrid-source')
+
+def configure_source_pool(request_workers: int):
+    """
+    Size the source pool for request_workers concurrent hybrid calls (3 threads each)
+    """
+    global _source_pool
+    previous = _source_pool
+    _source_pool = ThreadPoolExecutor(max_workers=3 * request_workers, thread_name_prefix='hybrid-source')
+    previous.shutdown(wait=False)
+
+# Fits the sub-models of new recommenders concurrently
+_build_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='model-build')
+
+# Construction steps reported by build_status, in order
+BUILD_STEPS = ['catalog', 'content_based', 'collaborative', 'indexes']
+
+# Guards the interaction rows queued by add_interactions until data is next read
+_data_lock = threading.Lock()
 
 class HybridRecommender:
-    def __init__(self, data: pd.DataFrame):
-        self.data = data
-        self.content_based = ContentBasedRecommender(data)
-        self.collaborative = CollaborativeFilteringRecommender(data)
+    # Default time budgets (seconds) for one source and for the whole hybrid call
+    source_timeout_seconds = 2.0
+    deadline_seconds = 3.0
+    # Default candidate fusion: 'weighted' (source weight, then rating) or 'rrf'
+    fusion = 'weighted'
     
-    def get_hybrid_recommendations(self, user_id: int, product_name: str = None, top_n: int = 10):
+    def __init__(self, data: pd.DataFrame, lazy: bool = False, factorization: str = 'svd',
+                 warm_start: 'HybridRecommender' = None, content_index_type: str = 'exact',
+                 svd_index_type: str = 'exact'):
         """
-        Get hybrid recommendations combining multiple approaches
-        """
-        recommendations = []
+        Build the catalog, then fit the content-based and collaborative models concurrently.
         
-        # 1. Get collaborative filtering recommendations
-        collab_recs = self.collaborative.get_user_based_recommendations(user_id, top_n)
-        if not collab_recs.empty:
-            collab_recs['recommendation_type'] = 'collaborative'
-            collab_recs['confidence'] = 0.8
-            recommendations.append(collab_recs)
+        With lazy=True the constructor returns as soon as the catalog is
+        built and the sub-models finish in the background; build_status()
+        reports their progress and using one before it is ready waits for it.
+        factorization ('svd' or 'als') picks the collaborative factor model;
+        ALS warm-starts from warm_start's factors when it used ALS too.
+        content_index_type and svd_index_type ('exact' or 'ivf') select the
+        nearest-neighbour index of the content and SVD/ALS searches.
+        """
+        self._data = data
+        self._pending_rows = []
+        self._build_status = {name: {'status': 'pending', 'seconds': None, 'error': None} for name in BUILD_STEPS}
+        self.catalog = self._track('catalog', lambda: ProductCatalog(data))
         
-        # 2. Get content-based recommendations if product is provided
+        builders = {
+            'content_based': lambda: ContentBasedRecommender(data, catalog=self.catalog, index_type=content_index_type),
+            'collaborative': lambda: CollaborativeFilteringRecommender(
+                data, catalog=self.catalog, factorization=factorization, svd_index_type=svd_index_type,
+                warm_start=warm_start.collaborative if warm_start is not None else None
+            ),
+        }
+        self._builds = {
+            name: _build_pool.submit(self._build_component, name, builder)
+            for name, builder in builders.items()
+        }
+        if not lazy:
+            for future in self._builds.values():
+                future.result()
+    
+    def _track(self, step: str, build):
+        """
+        Run one build step, recording its status and duration
+        """
+        status = self.build_status()[step]
+        status.update(status='building', error=None)
+        start = time.perf_counter()
+        try:
+            result = build()
+        except Exception as e:
+            status.update(status='failed', seconds=round(time.perf_counter() - start, 3), error=str(e))
+            raise
+        status.update(status='ready', seconds=round(time.perf_counter() - start, 3))
+        return result
+    
+    def _build_component(self, name: str, builder):
+        component = self._track(name, builder)
+        setattr(self, '_' + name, component)
+        return component
+    
+    def _component(self, name: str):
+        component = self.__dict__.get('_' + name)
+        if component is None:
+            # Still being fitted (lazy construction): wait for it, re-raising a failed build
+            component = self._builds[name].result()
+        return component
+    
+    @property
+    def content_based(self) -> ContentBasedRecommender:
+        return self._component('content_based')
+    
+    @property
+    def collaborative(self) -> CollaborativeFilteringRecommender:
+        return self._component('collaborative')
+    
+    def build_status(self) -> dict:
+        """
+        Per build step: status ('pending', 'building', 'ready' or 'failed'), seconds and error
+        """
+        if self.__dict__.get('_build_status') is None:
+            # Restored from artifacts: the models were loaded, only the indexes remain
+            self._build_status = {
+                name: {'status': 'pending' if name == 'indexes' else 'ready', 'seconds': None, 'error': None}
+                for name in BUILD_STEPS
+            }
+        return self._build_status
+    
+    def is_ready(self, *steps) -> bool:
+        """
+        Whether the given build steps (all of them by default) have finished
+        """
+        status = self.build_status()
+        return all(status[step]['status'] == 'ready' for step in steps or BUILD_STEPS)
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        """
+        All interaction rows, including those added since fitting (appended in one concat on first read)
+        """
+        if self._pending_rows:
+            with _data_lock:
+                if self._pending_rows:
+                    self._data = pd.concat([self._data, *self._pending_rows], ignore_index=True)
+                    self._pending_rows = []
+        return self._data
+    
+    @property
+    def profiles(self) -> UserProfiles:
+        """
+        Per-user aggregates over self.data, built on first use and updated by add_interactions
+        """
+        if self.__dict__.get('_profiles') is None:
+            self._profiles = UserProfiles(self.data)
+        return self._profiles
+    
+    def build_indexes(self):
+        """
+        Build the lazily created catalog and profile indexes now, off the request path
+        """
+        def build():
+            self.catalog.build_indexes()
+            self.profiles
+        self._track('indexes', build)
+    
+    def _collaborative_source(self, user_id: int, product_name: str, top_n: int) -> list:
+        rows = self.collaborative.user_based_rows(user_id, top_n)
+        return [('collaborative', rows)] if rows is not None and len(rows) else []
+    
+    def _content_source(self, user_id: int, product_name: str, top_n: int) -> list:
+        # Content-based recommendations if product is provided
         if product_name:
-            content_recs = self.content_based.get_recommendations(product_name, top_n)
-            if not content_recs.empty:
-                content_recs['recommendation_type'] = 'content_based'
-                content_recs['confidence'] = 0.7
-                recommendations.append(content_recs)
-        else:
-            # Get recommendations based on user's preferred categories
-            user_data = self.data[self.data['ID'] == user_id]
-            if not user_data.empty:
-                preferred_categories = user_data['Category'].value_counts().head(3).index.tolist()
-                for category in preferred_categories:
-                    category_recs = self.content_based.get_recommendations_by_category(category, top_n//2)
-                    if not category_recs.empty:
-                        category_recs['recommendation_type'] = 'category_based'
-                        category_recs['confidence'] = 0.6
-                        recommendations.append(category_recs)
-        
-        # 3. Get SVD recommendations
-        svd_recs = self.collaborative.get_svd_recommendations(user_id, top_n)
-        if not svd_recs.empty:
-            svd_recs['recommendation_type'] = 'svd'
-            svd_recs['confidence'] = 0.75
-            recommendations.append(svd_recs)
-        
-        # Combine all recommendations
-        if not recommendations:
-            return self._get_fallback_recommendations(top_n)
-        
-        combined_recs = pd.concat(recommendations, ignore_index=True)
-        
-        # Remove duplicates and sort by confidence and rating
-        combined_recs = combined_recs.drop_duplicates(subset=['Name'], keep='first')
-        combined_recs = combined_recs.sort_values(
-            ['confidence', 'Rating'], 
-            ascending=[False, False]
-        )
-        
-        return combined_recs.head(top_n).reset_index(drop=True)
-    
-    def _get_fallback_recommendations(self, top_n: int):
-        """
-        Get fallback recommendations when user-specific recommendations fail
-        """
-        # Return top-rated products
-        top_rated = self.data.sort_values(
-            ['Rating', 'ReviewCount'], 
-            ascending=[False, False]
-        ).head(top_n)
-        
-        result = top_rated[
-            ['Name', 'Brand', 'Category', 'Rating', 'ReviewCount', 'ImageURL', 'Description']
-        ].copy()
-        result['recommendation_type'] = 'top_rated'
-        result['confidence'] = 0.5
-        
-        return result.reset_index(drop=True)
+            similar = self.content_based.similar_rows(product_name, top_n)
+            return [('content_based', similar[0])] if similar is not None and len(similar[0]) else []
+        
+        # Otherwise recommendations based on user's preferred categories
+        candidates = []
+        for category in self.profiles.preferred_categories(user_id):
+            rows = self.catalog.top_rated_rows(top_n//2, category=category)
+            if len(rows):
+                candidates.append(('category_based', rows))
+        return candidates
+    
+    def _svd_source(self, user_id: int, product_name: str, top_n: int) -> list:
+        rows = self.collaborative.svd_rows(user_id, top_n)
+        return [('svd', rows)] if rows is not None and len(rows) else []
+    
+    def get_hybrid_recommendations(self, user_id: int, product_name: str = None, top_n: int = 10,
+                                   source_timeout: float = None, deadline: float = None, fusion: str = None):
+        """
+        Get hybrid recommendations combining multiple approaches.
+        
+        The collaborative, content/category and SVD sources run concurrently and
+        return ranked catalog rows, which are fused with 'weighted' or 'rrf'
+        fusion (class default when None). Each source gets source_timeout
+        seconds from when a pool thread starts it and the whole call deadline
+        seconds; sources that miss them are left out. The result's
+        attrs['sources'] maps each source to 'ok', 'empty', 'timeout' or 'error'.
+        """
+        sources = {
+            'collaborative': self._collaborative_source,
+            'content_based' if product_name else 'category_based': self._content_source,
+            'svd': self._svd_source,
+        }
+        start = time.monotonic()
+        source_timeout = self.source_timeout_seconds if source_timeout is None else source_timeout
+        call_deadline = start + (self.deadline_seconds if deadline is None else deadline)
+        
+        # Each source's own timeout runs from when a pool thread picks it up,
+        # not from submission; the call deadline runs from now
+        changed = threading.Condition()
+        started = {}
+        
+        def run_source(name, source):
+            with changed:
+                if time.monotonic() >= call_deadline:
+                    # Queued past the deadline: nobody is waiting for it any more
+                    return []
+                started[name] = time.monotonic()
+                changed.notify_all()
+            return source(user_id, product_name, top_n)
+        
+        def notify(_future):
+            with changed:
+                changed.notify_all()
+        
+        futures = {}
+        for name, source in sources.items():
+            futures[name] = _source_pool.submit(run_source, name, source)
+            futures[name].add_done_callback(notify)
+        
+        statuses = {}
+        with changed:
+            while True:
+                now = time.monotonic()
+                limits = {}
+                for name, future in futures.items():
+                    if name in statuses or future.done():
+                        continue
+                    limit = call_deadline if name not in started else min(call_deadline, started[name] + source_timeout)
+                    if now >= limit:
+                        future.cancel()
+                        statuses[name] = 'timeout'
+                    else:
+                        limits[name] = limit
+                if not limits:
+                    break
+                changed.wait(min(limits.values()) - now)
+        
+        candidates = []
+        for name, future in futures.items():
+            if name in statuses:
+                continue
+            if name not in started:
+                statuses[name] = 'timeout'
+                continue
+            try:
+                source_candidates = future.result()
+            except Exception as e:
+                print(f"❌ {name} recommendations failed: {str(e)}")
+                statuses[name] = 'error'
+                continue
+            statuses[name] = 'ok' if source_candidates else 'empty'
+            candidates.extend(source_candidates)
+        statuses = {name: statuses[name] for name in futures}
+        
+        result = self._combine(candidates, top_n, fusion)
+        result.attrs['sources'] = statuses
+        return result
+    
+    def recommend_many_rows(self, user_ids, top_n: int = 10, block_size: int = 1024, fusion: str = None):
+        """
+        Hybrid recommendations for many users at once (no product context), as arrays.
+        
+        Collaborative and SVD scores come from the batched matrix scoring in
+        CollaborativeFilteringRecommender, preferred categories from the user
+        profiles, and each category list is computed once per batch. Returns a
+        dict of user_id -> (catalog rows, recommendation types, confidences)
+        ranked as get_hybrid_recommendations(user_id, top_n=top_n); no product
+        details are looked up, so callers can fetch them once for a whole batch.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        collab = self.collaborative.recommend_many_rows(user_ids, top_n, method='user_based', block_size=block_size)
+        svd = self.collaborative.recommend_many_rows(user_ids, top_n, method='svd', block_size=block_size)
+        
+        preferred = self.profiles.preferred_categories_many(user_ids)
+        
+        category_cache = {}
+        results = {}
+        for user_id, categories in zip(user_ids, preferred):
+            candidates = []
+            if collab[user_id] is not None and len(collab[user_id]):
+                candidates.append(('collaborative', collab[user_id]))
+            
+            for category in categories:
+                if category not in category_cache:
+                    category_cache[category] = self.catalog.top_rated_rows(top_n//2, category=category)
+                if len(category_cache[category]):
+                    candidates.append(('category_based', category_cache[category]))
+            
+            if svd[user_id] is not None and len(svd[user_id]):
+                candidates.append(('svd', svd[user_id]))
+            
+            results[user_id] = self._fuse_rows(candidates, top_n, fusion)
+        
+        return results
+    
+    def recommend_many(self, user_ids, top_n: int = 10, block_size: int = 1024, fusion: str = None):
+        """
+        Same as recommend_many_rows, with a dict of user_id -> DataFrame
+        matching get_hybrid_recommendations(user_id, top_n=top_n)
+        """
+        results = self.recommend_many_rows(user_ids, top_n, block_size, fusion)
+        return {user_id: self._details(*result) for user_id, result in results.items()}
+    
+    def _fuse_rows(self, candidates: list, top_n: int, fusion: str = None):
+        """
+        Fuse ranked (source, catalog rows) candidate lists into the top-N
+        (catalog rows, recommendation types, confidences), or the top-rated
+        fallback when there are no candidates
+        """
+        if not candidates:
+            rows = self.catalog.top_rated_rows(top_n)
+            return rows, np.full(len(rows), 'top_rated', dtype=object), np.full(len(rows), SOURCE_WEIGHTS['top_rated'])
+        
+        rows, sources, scores = fuse(candidates, self.catalog.name_codes, self.catalog.ratings, top_n, fusion or self.fusion)
+        return rows, np.array([source for source, _ in candidates], dtype=object)[sources], scores
+    
+    def _details(self, rows: np.ndarray, recommendation_types: np.ndarray, confidences: np.ndarray) -> pd.DataFrame:
+        """
+        Product details for fused rows, with their recommendation_type and confidence columns
+        """
+        result = self.catalog.get_rows(rows)
+        result['recommendation_type'] = recommendation_types
+        result['confidence'] = confidences
+        return result
+    
+    def _combine(self, candidates: list, top_n: int, fusion: str = None):
+        """
+        Fuse ranked (source, catalog rows) candidate lists and look up details for the top-N only
+        """
+        return self._details(*self._fuse_rows(candidates, top_n, fusion))
+    
+    def facet_counts(self, column: str) -> pd.Series:
+        """
+        Interaction counts per Category or Brand value, most frequent first.
+        
+        Computed once and kept up to date by add_interactions.
+        """
+        cache = self.__dict__.setdefault('_facet_counts', {})
+        if column not in cache:
+            counts = self.data[column].value_counts(sort=False)
+            cache[column] = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        return cache[column]
+    
+    def add_interactions(self, interactions):
+        """
+        Add new (ID, ProdID, Rating) interactions and update the models online.
+        
+        interactions is a DataFrame or a list of dicts. Rows for products that
+        are not in the catalog, or with user IDs that do not fit the ID dtype,
+        are skipped. Returns a summary dict.
+        """
+        interactions = pd.DataFrame(interactions, columns=['ID', 'ProdID', 'Rating'])
+        total = len(interactions)
+        rows = self.catalog.rows_for_ids(interactions['ProdID'])
+        id_range = np.iinfo(self._data['ID'].dtype)
+        user_ids = interactions['ID'].to_numpy()
+        valid = (rows >= 0) & (interactions['Rating'].to_numpy() != 0)
+        valid &= (user_ids >= id_range.min) & (user_ids <= id_range.max)
+        interactions, rows = interactions[valid], rows[valid]
+        
+        added, new_users = self.collaborative.add_interactions(interactions)
+        
+        # Queue full interaction rows (product attributes from the catalog) for the shared data
+        if added:
+            new_rows = self.catalog.products.iloc[rows].drop(columns=['Rating']).reset_index(drop=True)
+            new_rows['ID'] = interactions['ID'].to_numpy().astype(self._data['ID'].dtype)
+            new_rows['Rating'] = interactions['Rating'].to_numpy(dtype=float)
+            with _data_lock:
+                first_row = len(self._data) + sum(len(pending) for pending in self._pending_rows)
+                self._pending_rows.append(new_rows[self._data.columns])
+            if self.__dict__.get('_profiles') is not None:
+                self._profiles.add(new_rows, first_row)
+            for column, counts in self.__dict__.get('_facet_counts', {}).items():
+                counts = counts.add(new_rows[column].value_counts(sort=False), fill_value=0).astype(int)
+                self._facet_counts[column] = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        
+        return {'added': added, 'new_users': new_users, 'skipped': total - added}
     
     def get_explanation(self, product_name: str, user_id: int, recommendation_type: str):
         """
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from .catalog import ProductCatalog
+from .columnar import save_array, load_array, stage_version, publish_version, latest_version
+
+# Source type codes stored per entry (position in this list)
+SOURCE_TYPES = ['collaborative', 'content_based', 'category_based', 'svd', 'top_rated']
+MANIFEST_FILE = 'manifest.json'
+
+def catalog_fingerprint(catalog: ProductCatalog) -> str:
+    """
+    Hash of the catalog's ProdID order; stored rows are only valid for an identical catalog
+    """
+    prod_ids = np.ascontiguousarray(catalog.products['ProdID'].to_numpy(dtype=np.int64))
+    return hashlib.sha256(prod_ids.tobytes()).hexdigest()
+
+def encode_recommendations(recommendations: dict, user_ids, top_n: int):
+    """
+    Fixed-width (catalog rows, scores, source codes) arrays for the user_id ->
+    (catalog rows, recommendation types, confidences) results of
+    HybridRecommender.recommend_many_rows.
+    
+    The fused catalog rows are stored as they are, so products sharing a name
+    keep their own rows. Rows are padded with -1 when a user has fewer than
+    top_n recommendations.
+    """
+    rows = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    scores = np.zeros((len(user_ids), top_n), dtype=np.float32)
+    sources = np.full((len(user_ids), top_n), -1, dtype=np.int8)
+    source_codes = {source: code for code, source in enumerate(SOURCE_TYPES)}
+    
+    for position, user_id in enumerate(user_ids):
+        user_rows, recommendation_types, confidences = (values[:top_n] for values in recommendations[user_id])
+        n = len(user_rows)
+        rows[position, :n] = user_rows
+        scores[position, :n] = confidences
+        sources[position, :n] = [source_codes[source] for source in recommendation_types]
+    
+    return rows, scores, sources
+
+def save_precomputed(root_dir: str, user_ids, rows, scores, sources, catalog: ProductCatalog, model_version: str = None) -> str:
+    """
+    Write a precomputed top-N store to a new version directory under root_dir
+    and point root_dir/LATEST at it. Returns the version directory.
+    """
+    version, staging = stage_version(root_dir)
+    
+    save_array(staging, 'user_ids', np.asarray(user_ids, dtype=np.int64))
+    save_array(staging, 'rows', rows)
+    save_array(staging, 'scores', scores)
+    save_array(staging, 'sources', sources)
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump({
+            'version': version,
+            'created_at': time.time(),
+            'top_n': int(rows.shape[1]),
+            'n_users': int(rows.shape[0]),
+            'source_types': SOURCE_TYPES,
+            'catalog_fingerprint': catalog_fingerprint(catalog),
+            'model_version': model_version,
+        }, f, indent=2)
+    
+    return publish_version(root_dir, version, staging)
+
+class PrecomputedStore:
+    """
+    Memory-mapped top-N recommendations per user, written by precompute.py.
+    
+    A lookup returns None (so the caller scores live) when the user is not in
+    the store, was marked stale by new interactions, asks for a different
+    number of items than the stored top_n (fusion and the per-source candidate
+    lists depend on it, so a shorter list is not a prefix of the stored one),
+    or when the whole store is older than max_age_seconds or was built
+    for a different catalog.
+    
+    stale_users is shared with the store this one replaces (when given):
+    precompute.py may score from a model that predates online interactions,
+    so a reload must not make their users' stored lists servable again.
+    """
+    def __init__(self, directory: str, max_age_seconds: float = 6 * 3600, stale_users: set = None):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.top_n = self.manifest['top_n']
+        self.user_index = pd.Index(load_array(directory, 'user_ids'))
+        self.rows = load_array(directory, 'rows')
+        self.scores = load_array(directory, 'scores')
+        self.sources = load_array(directory, 'sources')
+        self.source_types = np.array(self.manifest['source_types'], dtype=object)
+        self.stale_users = stale_users if stale_users is not None else set()
+        self.hits = 0
+        self.misses = 0
+        self._checked_catalog = None
+        self._catalog_matches = False
+    
+    @classmethod
+    def load(cls, root_dir: str, max_age_seconds: float = 6 * 3600, stale_users: set = None):
+        """
+        Latest store under root_dir, or None if nothing has been precomputed
+        """
+        try:
+            return cls(latest_version(root_dir), max_age_seconds, stale_users)
+        except FileNotFoundError:
+            return None
+    
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.manifest['created_at']
+    
+    def _usable_for(self, catalog: ProductCatalog) -> bool:
+        if catalog is not self._checked_catalog:
+            self._catalog_matches = catalog_fingerprint(catalog) == self.manifest['catalog_fingerprint']
+            self._checked_catalog = catalog
+        return self._catalog_matches and self.age_seconds <= self.max_age_seconds
+    
+    def mark_stale(self, user_ids):
+        """
+        Stop serving stored results for users whose interactions changed
+        """
+        self.stale_users.update(user_ids)
+    
+    def lookup(self, user_id: int, top_n: int, catalog: ProductCatalog):
+        """
+        Stored recommendations for user_id as a DataFrame, or None to score live
+        """
+        if top_n != self.top_n or user_id in self.stale_users or not self._usable_for(catalog):
+            self.misses += 1
+            return None
+        
+        position = self.user_index.get_indexer([user_id])[0]
+        if position < 0:
+            self.misses += 1
+            return None
+        
+        rows = self.rows[position, :top_n]
+        valid = rows >= 0
+        recommendations = catalog.get_rows(rows[valid])
+        recommendations['recommendation_type'] = self.source_types[self.sources[position, :top_n][valid]]
+        recommendations['confidence'] = self.scores[position, :top_n][valid].astype(float).round(6)
+        recommendations.attrs['sources'] = {'precomputed': 'ok'}
+        self.hits += 1
+        return recommendations
+    
+    def stats(self) -> dict:
+        return {
+            'version': self.manifest['version'],
+            'model_version': self.manifest['model_version'],
+            'top_n': self.top_n,
+            'n_users': len(self.user_index),
+            'age_seconds': round(self.age_seconds, 1),
+            'max_age_seconds': self.max_age_seconds,
+            'stale_users': len(self.stale_users),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
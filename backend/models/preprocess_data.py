@@ -1,9 +1,74 @@
+import hashlib
+import json
+import os
+import shutil
 import pandas as pd
 import numpy as np
+from .columnar import save_frame, load_frame
 
-def process_data(data: pd.DataFrame) -> pd.DataFrame:
+# Parse types for the raw CSV; IDs stay float until invalid/missing values are dropped
+CSV_DTYPES = {
+    'ID': 'float64',
+    'ProdID': 'float64',
+    'Rating': 'float64',
+    'ReviewCount': 'float64',
+    'Name': 'str',
+    'Category': 'str',
+    'Brand': 'str',
+    'Description': 'str',
+    'Tags': 'str',
+    'ImageURL': 'str',
+}
+CATEGORICAL_COLUMNS = ['Category', 'Brand']
+CACHE_FORMAT_VERSION = 1
+
+def _sample_additional_products(rng, user_codes: np.ndarray, product_codes: np.ndarray,
+                                n_users: int, n_products: int, counts: np.ndarray, max_rounds: int = 5):
+    """
+    For each user code u, sample up to counts[u] distinct product codes the user
+    has no interaction with yet.
+    
+    Candidates are drawn for all users at once and filtered against existing
+    (user, product) pairs; the few users still short after max_rounds are
+    sampled exactly. Returns (user_codes, product_codes), grouped by user.
+    """
+    owned_keys = np.unique(user_codes.astype(np.int64) * n_products + product_codes)
+    available = n_products - np.bincount(owned_keys // n_products, minlength=n_users)
+    remaining = np.minimum(counts, available).astype(np.int64)
+    taken_keys = np.empty(0, dtype=np.int64)
+    
+    for _ in range(max_rounds):
+        if not remaining.any():
+            break
+        # Oversample so most users are filled in a single round
+        users = np.repeat(np.arange(n_users, dtype=np.int64), np.where(remaining > 0, 2 * remaining + 8, 0))
+        keys = users * n_products + rng.integers(0, n_products, len(users))
+        
+        # Drop repeated draws (keeping draw order) and pairs the user already has
+        keys = keys[np.sort(np.unique(keys, return_index=True)[1])]
+        keys = keys[~np.isin(keys, owned_keys) & ~np.isin(keys, taken_keys)]
+        
+        # Keep at most remaining[u] new products per user (keys are still grouped by user)
+        users = keys // n_products
+        rank = np.arange(len(keys)) - np.searchsorted(users, users)
+        keys = keys[rank < remaining[users]]
+        
+        taken_keys = np.concatenate([taken_keys, keys])
+        remaining -= np.bincount(keys // n_products, minlength=n_users)
+    
+    # Exact fallback for users whose unowned pool was too small to fill by rejection
+    for user in np.flatnonzero(remaining > 0):
+        user_keys = np.concatenate([owned_keys, taken_keys])
+        pool = np.setdiff1d(np.arange(n_products), user_keys[user_keys // n_products == user] % n_products)
+        extra = rng.choice(pool, remaining[user], replace=False)
+        taken_keys = np.concatenate([taken_keys, user * n_products + extra])
+    
+    taken_keys = taken_keys[np.argsort(taken_keys // n_products, kind='stable')]
+    return taken_keys // n_products, taken_keys % n_products
+
+def clean_data(data: pd.DataFrame) -> pd.DataFrame:
     """
-    Clean and preprocess the dataset for recommendation algorithms
+    Row-wise cleaning of raw interaction rows (safe to apply chunk by chunk)
     """
     # Make a copy to avoid modifying original data
     data = data.copy()
@@ -22,56 +87,13 @@ def process_data(data: pd.DataFrame) -> pd.DataFrame:
     # Remove rows where ID or ProdID is 0
     data = data[(data["ID"] != 0) & (data['ProdID'] != 0)].copy()
 
-    data['ID'] = data["ID"].astype("int64")
-    data['ProdID'] = data['ProdID'].astype("int64")
-
-    # LIMIT USERS TO 100 - Get top 100 users with most interactions
-    user_counts = data['ID'].value_counts()
-    top_100_users = user_counts.head(100).index.tolist()
-    data = data[data['ID'].isin(top_100_users)].copy()
-    
-    # INCREASE PRODUCTS PER USER - Generate more interactions for each user
-    enhanced_data = []
-    
-    for user_id in top_100_users:
-        user_data = data[data['ID'] == user_id].copy()
-        
-        # Add more diverse products for each user
-        all_products = data['ProdID'].unique()
-        user_products = user_data['ProdID'].unique()
-        
-        # Add 20-50 more random products per user
-        num_additional = np.random.randint(20, 51)
-        available_products = [p for p in all_products if p not in user_products]
-        
-        if len(available_products) > 0:
-            additional_products = np.random.choice(
-                available_products, 
-                min(num_additional, len(available_products)), 
-                replace=False
-            )
-            
-            for product_id in additional_products:
-                # Get product info
-                product_info = data[data['ProdID'] == product_id].iloc[0].to_dict()
-                
-                # Create new interaction with random rating
-                new_interaction = product_info.copy()
-                new_interaction['ID'] = user_id
-                new_interaction['Rating'] = np.random.uniform(3.0, 5.0)  # Random rating 3-5
-                new_interaction['ReviewCount'] = np.random.randint(10, 1000)
-                
-                enhanced_data.append(new_interaction)
-        
-        enhanced_data.extend(user_data.to_dict('records'))
-    
-    # Create enhanced dataframe
-    data = pd.DataFrame(enhanced_data)
+    data['ID'] = data["ID"].astype("int32")
+    data['ProdID'] = data['ProdID'].astype("int32")
 
     # ReviewCount
     data["ReviewCount"] = pd.to_numeric(
         data["ReviewCount"], errors='coerce'
-    ).fillna(0).astype("int64")
+    ).fillna(0).astype("int32")
 
     # Drop unwanted column if exists
     if 'Unnamed: 0' in data.columns:
@@ -87,20 +109,119 @@ def process_data(data: pd.DataFrame) -> pd.DataFrame:
             data['ImageURL'].astype(str).str.split('|').str[0]
         )
     
-    # Fill missing ratings with median
+    # Ratings are filled with the median after augmentation
     data['Rating'] = pd.to_numeric(data['Rating'], errors='coerce')
+    
+    return data
+
+def _augment_data(data: pd.DataFrame, seed: int, max_users: int = 100) -> pd.DataFrame:
+    """
+    Keep the top max_users users (all users if None) and add synthetic interactions for each of them
+    """
+    rng = np.random.default_rng(seed)
+    
+    # LIMIT USERS - Get the top max_users users with most interactions
+    user_counts = data['ID'].value_counts()
+    top_users = user_counts.index if max_users is None else user_counts.head(max_users).index
+    data = data[data['ID'].isin(top_users)]
+    
+    # INCREASE PRODUCTS PER USER - Generate more interactions for each user
+    # One attribute row per product (first occurrence), indexed by product code
+    products = data.drop_duplicates(subset=['ProdID']).reset_index(drop=True)
+    product_codes = pd.Index(products['ProdID']).get_indexer(data['ProdID'])
+    user_codes = pd.Index(top_users).get_indexer(data['ID'])
+    
+    # Add 20-50 more random products per user
+    num_additional = rng.integers(20, 51, len(top_users))
+    new_users, new_products = _sample_additional_products(
+        rng, user_codes, product_codes, len(top_users), len(products), num_additional
+    )
+    
+    # Create new interactions with random ratings (3-5) from the product attribute rows
+    additional = products.iloc[new_products].reset_index(drop=True)
+    additional['ID'] = top_users[new_users].to_numpy()
+    additional['Rating'] = rng.uniform(3.0, 5.0, len(additional))
+    additional['ReviewCount'] = rng.integers(10, 1000, len(additional)).astype('int32')
+    
+    # Single concatenation: per user, the generated interactions come before the real ones
+    data = pd.concat([additional, data], ignore_index=True)
+    user_rank = np.concatenate([new_users, user_codes])
+    data = data.iloc[np.argsort(user_rank, kind='stable')].reset_index(drop=True)
+
+    # Fill missing ratings with median
     data['Rating'] = data['Rating'].fillna(data['Rating'].median())
     
     print(f"✅ Processed {len(data['ID'].unique())} users with average {len(data) // len(data['ID'].unique())} products per user")
     
     return data
 
-def load_and_process_data(file_path: str) -> pd.DataFrame:
+def _categorize(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store the low-cardinality text columns as categoricals
+    """
+    for col in CATEGORICAL_COLUMNS:
+        data[col] = data[col].astype('category')
+    return data
+
+def process_data(data: pd.DataFrame, seed: int = 42, max_users: int = 100) -> pd.DataFrame:
+    """
+    Clean and preprocess the dataset for recommendation algorithms.
+    
+    seed makes the synthetic interaction augmentation reproducible; max_users
+    caps the number of (most active) users kept, None keeps all of them.
+    """
+    return _augment_data(_categorize(clean_data(data)), seed, max_users)
+
+def _file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_clean_data(file_path: str, chunksize: int = 100000, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Read and clean the raw CSV chunk by chunk with explicit dtypes.
+    
+    The cleaned table is cached as .npy columns in cache_dir (default:
+    <file_path>.cache) and reused as long as the CSV's SHA-256 is unchanged.
+    """
+    cache_dir = cache_dir or file_path + '.cache'
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    source_hash = _file_hash(file_path)
+    
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') == CACHE_FORMAT_VERSION and manifest.get('source_hash') == source_hash:
+            return load_frame(cache_dir, 'data', manifest['columns'])
+    
+    chunks = pd.read_csv(
+        file_path,
+        dtype=CSV_DTYPES,
+        usecols=lambda col: col != 'Unnamed: 0',
+        chunksize=chunksize
+    )
+    data = _categorize(pd.concat([clean_data(chunk) for chunk in chunks], ignore_index=True))
+    
+    # Write the cache to a staging directory first so a crash never leaves a half-written cache
+    staging = cache_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    columns = save_frame(staging, 'data', data)
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({'format_version': CACHE_FORMAT_VERSION, 'source_hash': source_hash, 'columns': columns}, f)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.rename(staging, cache_dir)
+    
+    return data
+
+def load_and_process_data(file_path: str, seed: int = 42, max_users: int = 100) -> pd.DataFrame:
     """
-    Load data from CSV and process it
+    Load data from CSV (or its cleaned-data cache) and process it
     """
     try:
-        data = pd.read_csv(file_path)
-        return process_data(data)
+        data = load_clean_data(file_path)
+        return _augment_data(data, seed, max_users)
     except Exception as e:
         raise Exception(f"Error loading data: {str(e)}")
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+class UserProfiles:
+    """
+    Per-user aggregates over the interaction table, for O(1) profile lookups.
+    
+    Built in one vectorized pass: interaction counts, rating sums, a sparse
+    users x categories count matrix (ranked on lookup) and the interaction rows
+    grouped by user (row_order[row_offsets[u]:row_offsets[u + 1]]). New users
+    are appended, so existing user codes never change.
+    """
+    def __init__(self, data: pd.DataFrame):
+        categories = data['Category'].array
+        if not isinstance(categories, pd.Categorical):
+            categories = pd.Categorical(categories)
+        self.categories = np.asarray(categories.categories, dtype=object)
+        self.user_index = pd.Index(np.sort(data['ID'].unique()))
+        
+        user_codes = self.user_index.get_indexer(data['ID'])
+        self.row_order = np.argsort(user_codes, kind='stable')
+        self._accumulate(user_codes, data['Rating'].to_numpy(dtype=float), categories.codes, len(self.user_index))
+    
+    def _accumulate(self, user_codes: np.ndarray, ratings: np.ndarray, category_codes: np.ndarray, n_users: int):
+        """
+        Add interaction rows to the per-user aggregates (creating them on first use)
+        """
+        rated = ~np.isnan(ratings)
+        counts = np.bincount(user_codes, minlength=n_users)
+        rating_sums = np.bincount(user_codes[rated], weights=ratings[rated], minlength=n_users)
+        rating_counts = np.bincount(user_codes[rated], minlength=n_users)
+        
+        known = category_codes >= 0
+        category_counts = sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.int64), (user_codes[known], category_codes[known])),
+            shape=(n_users, len(self.categories))
+        )
+        
+        if 'interaction_counts' in self.__dict__:
+            grow = n_users - len(self.interaction_counts)
+            counts += np.concatenate([self.interaction_counts, np.zeros(grow, dtype=np.int64)])
+            rating_sums += np.concatenate([self.rating_sums, np.zeros(grow)])
+            rating_counts += np.concatenate([self.rating_counts, np.zeros(grow, dtype=np.int64)])
+            previous = sparse.vstack([self.category_counts, sparse.csr_matrix((grow, len(self.categories)), dtype=np.int64)])
+            category_counts = (previous + category_counts).tocsr()
+        
+        category_counts.sum_duplicates()
+        self.interaction_counts = counts
+        self.rating_sums = rating_sums
+        self.rating_counts = rating_counts
+        self.category_counts = category_counts
+        self.row_offsets = np.concatenate([[0], np.cumsum(counts)])
+    
+    def __len__(self):
+        return len(self.user_index)
+    
+    def _get_user_code(self, user_id: int):
+        code = self.user_index.get_indexer([user_id])[0]
+        return code if code >= 0 else None
+    
+    def lookup(self, user_id: int):
+        """
+        Profile dict (interactions, avg_rating, ranked categories) or None for unknown users
+        """
+        code = self._get_user_code(user_id)
+        if code is None:
+            return None
+        
+        rating_count = self.rating_counts[code]
+        return {
+            'interactions': int(self.interaction_counts[code]),
+            'avg_rating': self.rating_sums[code] / rating_count if rating_count else float('nan'),
+            'categories': self._ranked_categories(code),
+        }
+    
+    def _ranked_categories(self, code: int) -> list:
+        """
+        Categories of a user's interactions, most frequent first (ties in category order)
+        """
+        start, end = self.category_counts.indptr[code], self.category_counts.indptr[code + 1]
+        category_codes = self.category_counts.indices[start:end]
+        counts = self.category_counts.data[start:end]
+        return self.categories[category_codes[np.argsort(-counts, kind='stable')]].tolist()
+    
+    def preferred_categories(self, user_id: int, n_categories: int = 3) -> list:
+        """
+        A user's n most frequent categories (empty for unknown users)
+        """
+        code = self._get_user_code(user_id)
+        return [] if code is None else self._ranked_categories(code)[:n_categories]
+    
+    def preferred_categories_many(self, user_ids, n_categories: int = 3) -> list:
+        """
+        preferred_categories for a list of users, with one index lookup for all of them
+        """
+        codes = self.user_index.get_indexer(list(user_ids))
+        return [[] if code < 0 else self._ranked_categories(code)[:n_categories] for code in codes]
+    
+    def rows_for(self, user_id: int) -> np.ndarray:
+        """
+        Interaction table rows of a user, in table order
+        """
+        code = self._get_user_code(user_id)
+        if code is None:
+            return self.row_order[:0]
+        return self.row_order[self.row_offsets[code]:self.row_offsets[code + 1]]
+    
+    def add(self, new_rows: pd.DataFrame, first_row: int):
+        """
+        Account for interaction rows appended to the table at positions first_row onwards
+        """
+        ids = new_rows['ID'].to_numpy()
+        new_ids = pd.unique(ids[self.user_index.get_indexer(ids) < 0])
+        user_index = self.user_index.append(pd.Index(new_ids)) if len(new_ids) else self.user_index
+        user_codes = user_index.get_indexer(ids)
+        category_codes = pd.Categorical(new_rows['Category'], categories=self.categories).codes
+        
+        # Insert each new row at the end of its user's block (new users' blocks go last, in code order)
+        by_user = np.argsort(user_codes, kind='stable')
+        offsets = np.concatenate([self.row_offsets, np.full(len(new_ids), self.row_offsets[-1])])
+        self.row_order = np.insert(self.row_order, offsets[user_codes[by_user] + 1], first_row + by_user)
+        self._accumulate(user_codes, new_rows['Rating'].to_numpy(dtype=float), category_codes, len(user_index))
+        
+        # Publish the grown user index last so readers never see codes without aggregates
+        self.user_index = user_index
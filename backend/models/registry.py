@@ -0,0 +1,100 @@
+import threading
+import time
+import traceback
+from .hybrid_recommender import HybridRecommender
+
+class ModelVersion:
+    """
+    One generation of the served model. Online interactions update its
+    recommender in place; a rebuild produces a new version.
+    """
+    def __init__(self, version: int, recommender: HybridRecommender, build_seconds: float, source: str):
+        self.version = version
+        self.recommender = recommender
+        self.build_seconds = build_seconds
+        self.source = source
+        self.built_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    
+    @property
+    def data(self):
+        return self.recommender.data
+    
+    @property
+    def catalog(self):
+        return self.recommender.catalog
+
+class ModelRegistry:
+    """
+    Versioned reference to the served HybridRecommender with background rebuilds.
+    
+    Readers take a snapshot with `current` once per request and keep using it,
+    so a swap never changes the model under an in-flight request. A rebuild fits
+    a new recommender on a thread off the request path. Interactions that arrive
+    while it runs are replayed onto the new model before it is swapped in.
+    """
+    def __init__(self):
+        self.current = None
+        self.rebuilding = False
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pending_interactions = []
+    
+    def publish(self, recommender: HybridRecommender, build_seconds: float, source: str) -> ModelVersion:
+        """
+        Atomically make recommender the served model under a new version number
+        """
+        with self._lock:
+            version = self.current.version + 1 if self.current is not None else 1
+            self.current = ModelVersion(version, recommender, build_seconds, source)
+            return self.current
+    
+    def add_interactions(self, interactions) -> dict:
+        """
+        Apply interactions to the served model (and queue them for an in-progress rebuild)
+        """
+        with self._lock:
+            if self.rebuilding:
+                self._pending_interactions.extend(interactions)
+            return self.current.recommender.add_interactions(interactions)
+    
+    def start_rebuild(self, build_fn=None) -> bool:
+        """
+        Fit a new model in a background thread and swap it in when done.
+        
+        build_fn(data) -> HybridRecommender defaults to refitting on the current
+        model's data. Returns False if a rebuild is already running.
+        """
+        with self._lock:
+            if self.rebuilding or self.current is None:
+                return False
+            self.rebuilding = True
+            self._pending_interactions = []
+            data = self.current.data
+        
+        thread = threading.Thread(
+            target=self._rebuild, args=(data, build_fn or HybridRecommender), daemon=True
+        )
+        thread.start()
+        return True
+    
+    def _rebuild(self, data, build_fn):
+        start = time.perf_counter()
+        try:
+            recommender = build_fn(data.copy())
+            recommender.build_indexes()
+            with self._lock:
+                # Catch up on interactions that arrived during the build, then swap
+                if self._pending_interactions:
+                    recommender.add_interactions(self._pending_interactions)
+                build_seconds = time.perf_counter() - start
+                self.current = ModelVersion(self.current.version + 1, recommender, build_seconds, 'rebuild')
+                self.last_error = None
+            print(f"✅ Model rebuilt in {build_seconds:.1f}s (version {self.current.version})")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Model rebuild failed: {str(e)}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self.rebuilding = False
+                self._pending_interactions = []
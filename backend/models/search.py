@@ -0,0 +1,123 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Code points fit in 21 bits, so a bigram/trigram packs into one uint64 key
+_CODE_BITS = 21
+
+def _gram_keys(codes: np.ndarray, positions: np.ndarray, size: int) -> np.ndarray:
+    keys = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(size):
+        keys = (keys << np.uint64(_CODE_BITS)) | codes[positions + offset]
+    return keys
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+class _GramIndex:
+    """
+    Posting lists (ascending rank positions) for every n-gram of one size
+    """
+    def __init__(self, codes: np.ndarray, doc_of: np.ndarray, doc_end: np.ndarray, size: int):
+        self.size = size
+        positions = np.flatnonzero(np.arange(len(codes)) + size <= doc_end[doc_of])
+        keys = _gram_keys(codes, positions, size)
+        docs = doc_of[positions]
+        
+        # Sort by (gram, doc) and drop repeats of a gram within the same name;
+        # positions are already in doc order, so a stable sort on the gram suffices
+        order = np.argsort(keys, kind='stable')
+        keys, docs = keys[order], docs[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (docs[1:] != docs[:-1])
+        keys, self.postings = keys[first], docs[first].astype(np.int32)
+        
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        self.vocabulary = keys[starts]
+        self.offsets = np.append(starts, len(keys))
+    
+    def postings_for(self, key) -> np.ndarray:
+        position = np.searchsorted(self.vocabulary, key)
+        if position == len(self.vocabulary) or self.vocabulary[position] != key:
+            return self.postings[:0]
+        return self.postings[self.offsets[position]:self.offsets[position + 1]]
+
+class ProductSearchIndex:
+    """
+    Case-insensitive substring and word-prefix search over product names.
+    
+    Names are lowercased and indexed by their bigrams and trigrams, with every
+    posting list ordered by product rank (Rating, then ReviewCount, descending).
+    A query intersects the lists of its n-grams, shortest first, and only the
+    surviving candidates are checked against the full name, in rank order,
+    until enough matches are found.
+    """
+    def __init__(self, names, rank_order: np.ndarray):
+        names = pd.Series(names, dtype=object).fillna('').astype(str).str.lower().to_numpy()
+        
+        # rank_order maps rank position -> catalog row, best product first
+        self.order = np.asarray(rank_order)
+        self.names = names[self.order]
+        
+        # All ranked names as one code point array ('\0' separated) with the owning name per position
+        lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+        codes = _code_points('\x00'.join(self.names)) if len(names) else np.zeros(0, dtype=np.uint64)
+        doc_of = np.repeat(np.arange(len(names)), lengths + 1)[:len(codes)]
+        doc_end = np.cumsum(lengths + 1) - 1
+        self.grams = {size: _GramIndex(codes, doc_of, doc_end, size) for size in (2, 3)}
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def _candidates(self, query: str, first_block: int = 256):
+        """
+        Blocks of rank positions (ascending) whose names contain every n-gram
+        of query, a superset of the matches. Blocks grow geometrically so
+        that a query with many matches stops after intersecting a few hundred.
+        """
+        if len(query) < 2:
+            lists = [np.arange(len(self.order))]
+        else:
+            index = self.grams[min(len(query), 3)]
+            codes = _code_points(query)
+            keys = np.unique(_gram_keys(codes, np.arange(len(codes) - index.size + 1), index.size))
+            lists = sorted((index.postings_for(key) for key in keys), key=len)
+        
+        shortest, others = lists[0], lists[1:]
+        start, block_size = 0, first_block
+        while start < len(shortest):
+            candidates = shortest[start:start + block_size]
+            for postings in others:
+                positions = np.minimum(np.searchsorted(postings, candidates), len(postings) - 1)
+                candidates = candidates[postings[positions] == candidates]
+            yield candidates
+            start += block_size
+            block_size *= 4
+    
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> np.ndarray:
+        """
+        Catalog rows of the best-ranked names containing query (or, with
+        prefix=True, having a word that starts with query)
+        """
+        query = query.lower()
+        if not query:
+            return np.zeros(0, dtype=np.int64)
+        
+        # Word prefix: the match must not follow a letter or digit
+        pattern = re.compile((r'(?<![^\W_])' if prefix else '') + re.escape(query))
+        exact = not prefix and len(query) in (2, 3)
+        
+        hits = []
+        for candidates in self._candidates(query, first_block=max(256, limit)):
+            if exact:
+                # The n-gram lists are exact for queries of one n-gram
+                hits.extend(candidates[:limit - len(hits)])
+            else:
+                for candidate in candidates:
+                    if pattern.search(self.names[candidate]):
+                        hits.append(candidate)
+                        if len(hits) == limit:
+                            break
+            if len(hits) == limit:
+                break
+        return self.order[np.array(hits, dtype=np.int64)]
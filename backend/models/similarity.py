@@ -0,0 +1,188 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Memory budget (bytes) for the blocks one neighbour build or update holds at once, across all of
+# its threads. A sparse similarity block stores a float32 score and an int32 column (8 bytes) per
+# nonzero, at most block rows x n_rows of them, and _sparse_top_k adds only one row of temporaries.
+# A dense candidate block (update_top_k_neighbors) takes about 32 bytes per candidate with the
+# int64 / float32 temporaries of _select_top_k.
+MAX_BLOCK_BYTES = 1 << 28
+SPARSE_BYTES_PER_ENTRY = 8
+CANDIDATE_BYTES_PER_ENTRY = 32
+MAX_BLOCK_ROWS = 1024
+
+def top_n_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Indices of the top_n highest finite scores, best first
+    """
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > top_n:
+        candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def _select_top_k(candidates: np.ndarray, candidate_scores: np.ndarray, k: int, min_score: float):
+    """
+    Per row, the k best (candidate, score) pairs above min_score, best first,
+    padded with -1 / 0
+    """
+    top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(candidate_scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(np.take_along_axis(candidates, top, axis=1), order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    
+    keep = top_scores > min_score
+    return np.where(keep, top, -1), np.where(keep, top_scores, 0)
+
+def _sparse_top_k(similarities: sparse.csr_matrix, row_ids: np.ndarray, k: int, min_score: float):
+    """
+    Per row of a block of similarity rows (block row i is matrix row
+    row_ids[i]), the k best stored entries above min_score, best first
+    (ties by column), padded with -1 / 0.
+    Rows are reduced one at a time with a partial sort, so the only
+    temporaries are the size of one row.
+    """
+    n_block = similarities.shape[0]
+    indptr, cols, values = similarities.indptr, similarities.indices, similarities.data
+    indices = np.full((n_block, k), -1, dtype=np.int32)
+    scores = np.zeros((n_block, k), dtype=np.float32)
+    for i in range(n_block):
+        row_cols = cols[indptr[i]:indptr[i + 1]]
+        row_values = values[indptr[i]:indptr[i + 1]]
+        keep = np.flatnonzero((row_values > min_score) & (row_cols != row_ids[i]))  # never a neighbour of itself
+        if len(keep) > k:
+            # Everything scoring at least the k-th best, ties included
+            kth = np.partition(row_values[keep], len(keep) - k)[len(keep) - k]
+            keep = keep[row_values[keep] >= kth]
+        top = keep[np.lexsort((row_cols[keep], -row_values[keep]))[:k]]
+        indices[i, :len(top)] = row_cols[top]
+        scores[i, :len(top)] = row_values[top]
+    return indices, scores
+
+def top_k_neighbors(matrix, k: int, min_score: float = 0.0, block_size: int = None, n_jobs: int = 1):
+    """
+    Truncated cosine-similarity neighbour table over the rows of a sparse matrix.
+    
+    Similarities are computed one block of rows at a time and reduced to
+    the top k per row straight from the sparse block, so peak memory is one
+    block (8 bytes per nonzero, at most block_size x n_rows) per thread
+    instead of n_rows x n_rows. block_size defaults to as many rows as keep
+    the n_jobs blocks together under MAX_BLOCK_BYTES. With n_jobs > 1, blocks are spread over a thread pool
+    (the sparse products and sorts run outside the GIL), which is safe to use
+    from a threaded server, unlike forking. Only positive similarities can be
+    neighbours (min_score >= 0).
+    Returns (indices, scores) arrays of shape (n_rows, k); missing neighbours
+    are padded with -1 / 0.
+    """
+    normalized = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+    transposed = normalized.T.tocsr()
+    n_rows = normalized.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    indices = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+    
+    block_size = block_size or max(1, min(
+        MAX_BLOCK_ROWS, MAX_BLOCK_BYTES // (SPARSE_BYTES_PER_ENTRY * n_rows * max(1, n_jobs))
+    ))
+    
+    def block_top_k(start: int):
+        stop = min(start + block_size, n_rows)
+        indices[start:stop], scores[start:stop] = _sparse_top_k(
+            normalized[start:stop] @ transposed, np.arange(start, stop), k, min_score
+        )
+    
+    starts = range(0, n_rows, block_size)
+    if n_jobs > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(starts)), thread_name_prefix='neighbors') as pool:
+            list(pool.map(block_top_k, starts))
+    else:
+        for start in starts:
+            block_top_k(start)
+    
+    return indices, scores
+
+def row_norms(matrix) -> np.ndarray:
+    """
+    Euclidean norm of every row of a sparse matrix
+    """
+    matrix = sparse.csr_matrix(matrix)
+    return np.sqrt(np.bincount(
+        np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr)), weights=matrix.data.astype(np.float64) ** 2,
+        minlength=matrix.shape[0]
+    )).astype(np.float32)
+
+def update_top_k_neighbors(indices: np.ndarray, scores: np.ndarray, matrix, changed_rows, min_score: float = 0.0,
+                           transposed=None, norms: np.ndarray = None):
+    """
+    Refresh a top_k_neighbors table in place after some rows of matrix changed.
+    
+    Changed rows get an exact new neighbour list. Another row is re-selected
+    only if a changed row would enter its list (its new similarity reaches
+    the row's k-th score, or the list has room) or the row already lists a
+    changed row; it drops its entries for changed rows and merges in the new
+    similarities. Entries it loses are not backfilled from beyond the stored
+    k, so those lists are approximate until the next full build. All other
+    rows are untouched. Changed rows may gain entries or change their values
+    but not lose entries. indices and scores must have a row for every row
+    of matrix; rows appended since the build (padded with -1 / 0) must be
+    among changed_rows.
+    
+    Only the changed rows are normalized: transposed (matrix.T as CSR) and
+    norms (row_norms(matrix)) are computed from matrix when not given, so
+    callers that keep them up to date avoid a pass over the whole matrix.
+    """
+    matrix = sparse.csr_matrix(matrix)
+    n_rows, k = matrix.shape[0], indices.shape[1]
+    changed = np.unique(np.asarray(changed_rows, dtype=np.int64))
+    if k == 0 or len(changed) == 0:
+        return
+    if transposed is None:
+        transposed = matrix.T.tocsr()
+    if norms is None:
+        norms = row_norms(matrix)
+    
+    # Cosine similarities of the changed rows to every row, kept sparse
+    with np.errstate(divide='ignore'):
+        inverse_norms = np.where(norms > 0, 1 / norms, 0).astype(np.float32)
+    fresh = sparse.csr_matrix(sparse.diags(inverse_norms[changed]) @ matrix[changed] @ transposed, dtype=np.float32)
+    fresh.data *= inverse_norms[fresh.indices]
+    
+    # Changed rows are recomputed exactly
+    indices[changed], scores[changed] = _sparse_top_k(fresh, changed, k, min_score)
+    
+    # Only rows sharing a column with a changed row can list one, since rows only gain or update
+    # entries. Of those, re-select the rows a changed row would enter (its best new similarity
+    # reaches the k-th score, or beats min_score while the list has room) or already lists.
+    is_changed = np.zeros(n_rows + 1, dtype=bool)  # the extra last entry maps padding (-1) to False
+    is_changed[changed] = True
+    fresh_by_row = fresh.T.tocsr()
+    sharing = np.flatnonzero(np.diff(fresh_by_row.indptr))
+    sharing = sharing[~is_changed[sharing]]
+    if len(sharing) == 0:
+        return
+    best = np.maximum.reduceat(fresh_by_row.data, fresh_by_row.indptr[sharing])
+    full = indices[sharing, -1] >= 0
+    enters = np.where(full, best >= scores[sharing, -1], best > min_score)
+    rest = sharing[~enters]
+    affected = np.union1d(sharing[enters], rest[is_changed[indices[rest]].any(axis=1)])
+    
+    block_size = max(1, MAX_BLOCK_BYTES // (CANDIDATE_BYTES_PER_ENTRY * (k + len(changed))))
+    for start in range(0, len(affected), block_size):
+        rows = affected[start:start + block_size]
+        block_indices = indices[rows]
+        
+        # Stored neighbours that are still valid, plus every changed row as a candidate
+        valid = (block_indices >= 0) & ~is_changed[block_indices]
+        candidates = np.concatenate([
+            np.where(valid, block_indices, -1),
+            np.broadcast_to(changed, (len(rows), len(changed)))
+        ], axis=1)
+        candidate_scores = np.concatenate([
+            np.where(valid, scores[rows], -np.inf),
+            fresh_by_row[rows].toarray()
+        ], axis=1)
+        indices[rows], scores[rows] = _select_top_k(candidates, candidate_scores, k, min_score)
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class PoolSaturatedError(Exception):
+    """
+    Raised when a WorkerPool already holds its maximum number of queued calls
+    """
+
+class WorkerPool:
+    """
+    Bounded thread pool for running blocking recommender calls from async code.
+    
+    At most max_workers calls run at once and at most max_queue more wait for a
+    thread; anything beyond that is rejected immediately with PoolSaturatedError
+    instead of piling up. Each call has a deadline: the awaiting request gets
+    asyncio.TimeoutError when it passes, and the call is cancelled if it has not
+    started yet. A call that already started keeps its slot until it finishes.
+    """
+    def __init__(self, max_workers: int = None, max_queue: int = 64, timeout_seconds: float = 10.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='recommender')
+    
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+    
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) on a worker thread and await its result
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturatedError(f"{self.in_flight} calls already in flight")
+            self.in_flight += 1
+        
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'timeout_seconds': self.timeout_seconds,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
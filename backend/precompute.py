@@ -0,0 +1,79 @@
+"""
+Score every user with the hybrid recommender across worker processes and write
+a memory-mappable top-N store that app.py serves from before scoring live.
+
+Usage: python precompute.py [--artifacts artifacts] [--output precomputed] [--top-n 10] [--workers N]
+
+Models are loaded from build_artifacts.py output when present, and spawned
+worker processes map the same files; otherwise they are fitted from --data and
+shared by worker threads in this process (never forked: the model owns thread
+pools, which a forked child would inherit without their threads).
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from models import load_and_process_data, HybridRecommender, load_artifacts
+from models.columnar import latest_version
+from models.precomputed import encode_recommendations, save_precomputed
+from models.fusion import FUSION_METHODS
+
+# Model used by the workers (this process's model for threads, loaded by _init_worker in spawned processes)
+_recommender = None
+
+def _init_worker(artifact_dir: str):
+    global _recommender
+    if _recommender is None:
+        _recommender = load_artifacts(artifact_dir)
+
+def _score_chunk(args):
+    user_ids, top_n, fusion = args
+    recommendations = _recommender.recommend_many_rows(user_ids, top_n, fusion=fusion)
+    return encode_recommendations(recommendations, user_ids, top_n)
+
+def main():
+    global _recommender
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for all users")
+    parser.add_argument('--data', default=os.path.join(base_dir, "clean_data.csv"))
+    parser.add_argument('--artifacts', default=os.environ.get("ARTIFACT_DIR", os.path.join(base_dir, "artifacts")))
+    parser.add_argument('--output', default=os.environ.get("PRECOMPUTED_DIR", os.path.join(base_dir, "precomputed")))
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=512)
+    parser.add_argument('--fusion', choices=FUSION_METHODS, default=os.environ.get("HYBRID_FUSION", "weighted"))
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    _recommender = load_artifacts(args.artifacts)
+    model_version = None
+    if _recommender is not None:
+        model_version = os.path.basename(latest_version(args.artifacts))
+    else:
+        _recommender = HybridRecommender(
+            load_and_process_data(args.data), factorization=os.environ.get("FACTORIZATION", "svd"),
+            content_index_type=os.environ.get("CONTENT_INDEX_TYPE", "exact"),
+            svd_index_type=os.environ.get("SVD_INDEX_TYPE", "exact")
+        )
+    
+    user_ids = np.sort(_recommender.data['ID'].unique()).tolist()
+    chunks = [(user_ids[i:i + args.chunk_size], args.top_n, args.fusion) for i in range(0, len(user_ids), args.chunk_size)]
+    
+    if model_version is not None:
+        with multiprocessing.get_context('spawn').Pool(args.workers, initializer=_init_worker, initargs=(args.artifacts,)) as pool:
+            parts = pool.map(_score_chunk, chunks)
+    else:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='precompute') as pool:
+            parts = list(pool.map(_score_chunk, chunks))
+    
+    rows, scores, sources = (np.concatenate(arrays) for arrays in zip(*parts))
+    directory = save_precomputed(args.output, user_ids, rows, scores, sources, _recommender.catalog, model_version)
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ Precomputed top-{args.top_n} for {len(user_ids)} users in {elapsed:.1f}s: {directory}")
+
+if __name__ == "__main__":
+    main()
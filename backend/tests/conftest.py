@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import HybridRecommender
+
+CATEGORIES = ['Beauty', 'Hair Care', 'Nail Polish', 'Skin Care', 'Makeup']
+
+def make_interactions(n_users: int = 120, n_products: int = 300, per_user: int = 15, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic processed interaction table (the columns load_and_process_data produces)
+    """
+    rng = np.random.default_rng(seed)
+    products = pd.DataFrame({
+        'ProdID': np.arange(1, n_products + 1, dtype='int32'),
+        'Name': [f'Product {i % (n_products - 20)}' for i in range(n_products)],
+        'Brand': [f'Brand {i % 7}' for i in range(n_products)],
+        'Category': pd.Categorical([CATEGORIES[i % len(CATEGORIES)] for i in range(n_products)]),
+        'ImageURL': [f'http://img/{i}.jpg' for i in range(n_products)],
+        'Description': [f'{CATEGORIES[i % len(CATEGORIES)].lower()} item {i} ' * (1 + i % 9) for i in range(n_products)],
+        'Tags': [f'tag{i % 11} tag{i % 5}' for i in range(n_products)],
+        'ReviewCount': rng.integers(1, 500, n_products).astype('int32'),
+    })
+    data = pd.DataFrame({
+        'ID': np.repeat(np.arange(1, n_users + 1), per_user).astype('int32'),
+        'ProdID': rng.integers(1, n_products + 1, n_users * per_user).astype('int32'),
+    })
+    data = data.merge(products, on='ProdID', how='left')
+    data['Rating'] = rng.integers(1, 6, len(data)).astype(float)
+    return data
+
+@pytest.fixture(scope='session')
+def recommender() -> HybridRecommender:
+    return HybridRecommender(make_interactions())
@@ -0,0 +1,18 @@
+from models.cache import RecommendationCache
+
+def test_put_computed_before_invalidation_is_dropped():
+    cache = RecommendationCache()
+    generation = cache.generation(7)
+    cache.invalidate_user(7)
+    cache.put(1, (7, None, 10), ['stale'], user_id=7, generation=generation)
+    assert cache.get(1, (7, None, 10)) is None
+    
+    cache.put(1, (7, None, 10), ['fresh'], user_id=7, generation=cache.generation(7))
+    assert cache.get(1, (7, None, 10)) == ['fresh']
+
+def test_invalidation_only_bumps_that_user():
+    cache = RecommendationCache()
+    generation = cache.generation(8)
+    cache.invalidate_user(7)
+    cache.put(1, (8, None, 10), ['kept'], user_id=8, generation=generation)
+    assert cache.get(1, (8, None, 10)) == ['kept']
@@ -0,0 +1,22 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import make_interactions
+from models import HybridRecommender
+from models import hybrid_recommender
+
+def test_source_timeout_starts_when_the_source_runs(monkeypatch):
+    recommender = HybridRecommender(make_interactions(n_users=20, n_products=60))
+    def slow(source):
+        def run(*args):
+            time.sleep(0.3)
+            return source(*args)
+        return run
+    monkeypatch.setattr(recommender, '_collaborative_source', slow(recommender._collaborative_source))
+    monkeypatch.setattr(recommender, '_content_source', slow(recommender._content_source))
+    monkeypatch.setattr(recommender, '_svd_source', slow(recommender._svd_source))
+    
+    # One thread: the last source waits 0.6s in the queue, then still gets its 0.4s
+    monkeypatch.setattr(hybrid_recommender, '_source_pool', ThreadPoolExecutor(max_workers=1))
+    result = recommender.get_hybrid_recommendations(1, source_timeout=0.4, deadline=2.0)
+    assert result.attrs['sources'] == {'collaborative': 'ok', 'category_based': 'ok', 'svd': 'ok'}
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_interactions
+from models import CollaborativeFilteringRecommender
+from models.similarity import top_k_neighbors
+
+def test_add_interactions_updates_neighbour_lists():
+    data = make_interactions()
+    collaborative = CollaborativeFilteringRecommender(data, n_jobs=1)
+    before = collaborative._state
+    n_users = len(before.user_index)
+    
+    # A new user with exactly user 1's ratings is user 1's closest neighbour
+    ratings = data[data['ID'] == 1].groupby('ProdID', as_index=False)['Rating'].mean()
+    applied, new_users = collaborative.add_interactions(ratings.assign(ID=10**6)[['ID', 'ProdID', 'Rating']])
+    assert (applied, new_users) == (len(ratings), 1)
+    
+    state = collaborative._state
+    new_row = state.user_index.get_loc(10**6)
+    user_row = state.user_index.get_loc(1)
+    assert state.user_neighbors[user_row, 0] == new_row
+    np.testing.assert_allclose(state.user_neighbor_scores[user_row, 0], 1.0, atol=1e-5)
+    
+    # The new user's list is exact; the previous state still only sees its own rows
+    _, exact_scores = top_k_neighbors(state.user_item_matrix, collaborative.n_neighbors)
+    np.testing.assert_allclose(state.user_neighbor_scores[new_row], exact_scores[new_row], atol=1e-5)
+    assert len(before.user_neighbors) == len(before.user_factors) == n_users
+    assert len(state.user_neighbors) == len(state.user_factors) == n_users + 1
+    
+    # Later updates reuse the same buffers
+    collaborative.add_interactions(pd.DataFrame({'ID': [10**6 + 1], 'ProdID': [ratings['ProdID'].iloc[0]], 'Rating': [4.0]}))
+    assert np.shares_memory(collaborative._state.user_neighbors, state.user_neighbors)
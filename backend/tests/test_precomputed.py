@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from models.precomputed import encode_recommendations, save_precomputed, PrecomputedStore
+
+STORED_TOP_N = 10
+
+@pytest.fixture(scope='module')
+def store(recommender, tmp_path_factory):
+    user_ids = np.sort(recommender.data['ID'].unique()).tolist()
+    recommendations = recommender.recommend_many_rows(user_ids, STORED_TOP_N)
+    rows, scores, sources = encode_recommendations(recommendations, user_ids, STORED_TOP_N)
+    directory = save_precomputed(str(tmp_path_factory.mktemp('precomputed')), user_ids, rows, scores, sources, recommender.catalog)
+    return PrecomputedStore(directory)
+
+@pytest.mark.parametrize('limit', [1, 3, 5, STORED_TOP_N, 15])
+def test_store_matches_live_scoring(recommender, store, limit):
+    served = 0
+    for user_id in np.sort(recommender.data['ID'].unique())[:40]:
+        stored = store.lookup(int(user_id), limit, recommender.catalog)
+        if stored is None:
+            continue
+        served += 1
+        live = recommender.get_hybrid_recommendations(int(user_id), top_n=limit)
+        assert stored['Name'].tolist() == live['Name'].tolist()
+        assert stored['recommendation_type'].tolist() == live['recommendation_type'].tolist()
+        np.testing.assert_allclose(stored['confidence'], live['confidence'], atol=1e-6)
+    
+    # Only the stored list length is served; other limits are scored live
+    assert served == (40 if limit == STORED_TOP_N else 0)
+
+def test_reload_keeps_stale_users(recommender, store):
+    previous = PrecomputedStore(store.directory)
+    user_id = int(previous.user_index[0])
+    previous.mark_stale([user_id])
+    reloaded = PrecomputedStore(store.directory, stale_users=previous.stale_users)
+    assert reloaded.lookup(user_id, STORED_TOP_N, recommender.catalog) is None
+    assert reloaded.lookup(int(previous.user_index[1]), STORED_TOP_N, recommender.catalog) is not None